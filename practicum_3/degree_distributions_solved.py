@@ -1,3 +1,4 @@
+from itertools import islice
 from pathlib import Path
 
 import numpy as np
@@ -5,7 +6,9 @@ import matplotlib.pyplot as plt
 import networkx as nx
 
 from src.plotting.graphs import plot_graph, plot_network_via_plotly
-from src.common import NDArrayFloat
+from src.common import NDArrayInt, NDArrayFloat
+from src.csr import from_csr
+from src.graph_cache import load_graph_cached
 
 
 def build_degree_histogram(G) -> tuple[NDArrayFloat, NDArrayFloat]:
@@ -15,11 +18,63 @@ def build_degree_histogram(G) -> tuple[NDArrayFloat, NDArrayFloat]:
     return hist, mids
 
 
+def read_degrees_streaming(path: Path, chunk_size: int = 1_000_000) -> NDArrayInt:
+    """
+    Computes node degrees from an edge list file with non-negative integer
+    node ids in the first two columns (other columns are ignored).
+    The file is parsed by chunks of chunk_size lines, so the memory is O(n)
+    where n is the largest node id, regardless of the number of edges.
+    Each line counts as an edge, i.e. duplicated edges are not merged.
+    Returns the degrees of the nodes present in the file
+    """
+    degrees = np.zeros((0,), dtype=np.int64)
+    with open(path) as f:
+        while True:
+            lines = list(islice(f, chunk_size))
+            if not lines:
+                break
+            edges = np.loadtxt(lines, usecols=(0, 1), dtype=np.int64, ndmin=2)
+            chunk_degrees = np.bincount(edges.reshape(-1))
+            if len(chunk_degrees) > len(degrees):
+                degrees = np.pad(degrees, (0, len(chunk_degrees) - len(degrees)))
+            degrees[: len(chunk_degrees)] += chunk_degrees
+    return degrees[degrees > 0]
+
+
+def build_log_degree_histogram(
+    degrees: NDArrayInt, n_bins: int = 20
+) -> tuple[NDArrayFloat, NDArrayFloat]:
+    """
+    Histogram over logarithmically spaced bins which is more suitable
+    for heavy-tailed distributions plotted in loglog scale. Counts are divided
+    by the bin widths and the number of nodes to get the probability density
+    """
+    bin_edges = np.logspace(0, np.log10(degrees.max() + 1), n_bins + 1)
+    hist, bin_edges = np.histogram(degrees, bins=bin_edges)
+    density = hist / np.diff(bin_edges) / len(degrees)
+    mids = np.sqrt(bin_edges[:-1] * bin_edges[1:])  # geometric mean
+    return density, mids
+
+
+def build_degree_ccdf(degrees: NDArrayInt) -> tuple[NDArrayFloat, NDArrayInt]:
+    """
+    Complementary cumulative distribution P(K >= k) for each distinct degree k.
+    Unlike histograms, it does not depend on binning
+    """
+    ks, counts = np.unique(degrees, return_counts=True)
+    ccdf = np.cumsum(counts[::-1])[::-1] / len(degrees)
+    return ccdf, ks
+
+
 if __name__ == "__main__":
     # USairport500.txt stores a network of the most active US airports.
     # This is a typical example of a scale-free network as some airports
-    # are known to be hubs
-    G_airports = nx.read_edgelist(Path("practicum_3") / "USairport500.txt", nodetype=int, data=(("weight", float),))
+    # are known to be hubs. The text file is parsed only once, subsequent runs
+    # load the graph from the binary cache
+    csr_airports = load_graph_cached(
+        Path("practicum_3") / "USairport500.txt", weight="weight", nodetype=int
+    )
+    G_airports = from_csr(csr_airports, directed=False)
     pos = nx.spring_layout(G_airports)
     plot_network_via_plotly(G=G_airports, pos=pos, name="airports")
 
@@ -41,3 +96,19 @@ if __name__ == "__main__":
     fig.tight_layout()
     plt.show()
 
+    # The same edge list processed in streaming mode, without building a graph
+    degrees = read_degrees_streaming(Path("practicum_3") / "USairport500.txt")
+    fig, axes = plt.subplots(1, 2, figsize=(12, 6))
+    density, mids = build_log_degree_histogram(degrees)
+    axes[0].loglog(mids, density, "o--")
+    axes[0].set_xlabel(r"$k$", fontsize=12)
+    axes[0].set_ylabel(r"$p(k)$", fontsize=12)
+    ccdf, ks = build_degree_ccdf(degrees)
+    axes[1].loglog(ks, ccdf, "o--")
+    axes[1].set_xlabel(r"$k$", fontsize=12)
+    axes[1].set_ylabel(r"$P(K \geq k)$", fontsize=12)
+    for ax in axes:
+        ax.grid()
+    fig.tight_layout()
+    plt.show()
+
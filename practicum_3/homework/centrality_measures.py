@@ -1,11 +1,16 @@
-from typing import Any, Protocol
+from concurrent.futures import ProcessPoolExecutor
+import heapq
+from typing import Any, Callable, Optional, Protocol
 from itertools import combinations
 
 import numpy as np
 import networkx as nx
+import scipy.sparse
 
 from src.plotting.graphs import plot_graph, plot_network_via_plotly
-from src.common import AnyNxGraph 
+from src.common import AnyNxGraph, NDArrayInt, NDArrayFloat
+from src.csr import CsrGraph, to_csr, gather_neighbors
+from src.linalg import get_numpy_eigenvalues
 
 
 class CentralityMeasure(Protocol):
@@ -13,31 +18,377 @@ class CentralityMeasure(Protocol):
         ...
 
 
-def closeness_centrality(G: AnyNxGraph) -> dict[Any, float]:
+def _bit_counts(masks: NDArrayInt) -> NDArrayInt:
+    """
+    For an array of uint64 masks, returns the number of masks having
+    bit i set for each i = 0, ..., 63
+    """
+    masks = masks[masks != 0]
+    bits = np.unpackbits(masks.view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+    return bits.sum(axis=0, dtype=np.int_)
 
-    ##########################
-    ### PUT YOUR CODE HERE ###
-    #########################
 
-    pass
+def _multi_source_bfs_distance_sums(
+    csr: CsrGraph, sources: NDArrayInt
+) -> tuple[NDArrayInt, NDArrayFloat, NDArrayInt]:
+    """
+    MS-BFS: runs BFS from up to 64 sources simultaneously. Each node keeps
+    a uint64 mask of the BFS instances which have already seen it, and
+    the frontier of all the instances is a single uint64 mask per node.
+    The BFS is done over incoming paths (distances from v to each source), so
+    a node joins the next frontier of an instance if any of its successors
+    is in the current frontier of the instance.
 
+    Returns, for each source, the sum of distances, the sum of inverse
+    distances and the number of nodes reaching the source (including itself)
+    """
+    n = len(csr.nodes)
+    n_sources = len(sources)
+    source_bits = np.left_shift(np.uint64(1), np.arange(n_sources, dtype=np.uint64))
+    seen = np.zeros((n,), dtype=np.uint64)
+    frontier = np.zeros((n,), dtype=np.uint64)
+    seen[sources] = source_bits
+    frontier[sources] = source_bits
+    is_empty_row = csr.indptr[:-1] == csr.indptr[1:]
 
-def betweenness_centrality(G: AnyNxGraph) -> dict[Any, float]: 
+    dist_sums = np.zeros((64,), dtype=np.int_)
+    inv_dist_sums = np.zeros((64,), dtype=np.float64)
+    n_reached = np.ones((64,), dtype=np.int_)
+    d = 0
+    while np.any(frontier):
+        d += 1
+        # OR of the frontier masks over the successors of each node. The extra
+        # zero at the end keeps reduceat in bounds for trailing empty rows
+        values = np.append(frontier[csr.indices], np.uint64(0))
+        next_frontier = np.bitwise_or.reduceat(values, csr.indptr[:-1])
+        next_frontier[is_empty_row] = 0
+        next_frontier &= ~seen
+        seen |= next_frontier
+        frontier = next_frontier
 
-    ##########################
-    ### PUT YOUR CODE HERE ###
-    #########################
+        counts = _bit_counts(frontier)
+        dist_sums += d * counts
+        inv_dist_sums += counts / d
+        n_reached += counts
+    return dist_sums[:n_sources], inv_dist_sums[:n_sources], n_reached[:n_sources]
 
-    pass
 
+def closeness_centrality(
+    G: AnyNxGraph, harmonic: bool = False, wf_improved: bool = True
+) -> dict[Any, float]:
+    """
+    Closeness centrality of unweighted graphs computed by batches of 64 BFS
+    at once (see _multi_source_bfs_distance_sums). As in networkx, distances
+    are measured from other nodes to the given one, and for disconnected graphs
+    the closeness is scaled by the fraction of reachable nodes (wf_improved).
+    If harmonic is set, the harmonic centrality, i.e. the sum of inverse
+    distances which is well-defined for disconnected graphs, is returned instead
+    """
+    csr = to_csr(G)
+    centrality = closeness_of_sources(
+        csr, np.arange(len(csr.nodes)), harmonic=harmonic, wf_improved=wf_improved
+    )
+    return dict(zip(csr.nodes, centrality.tolist()))
 
-def eigenvector_centrality(G: AnyNxGraph) -> dict[Any, float]: 
 
-    ##########################
-    ### PUT YOUR CODE HERE ###
-    #########################
+def closeness_of_sources(
+    csr: CsrGraph, sources: NDArrayInt, harmonic: bool = False, wf_improved: bool = True
+) -> NDArrayFloat:
+    """
+    Closeness centrality of the given node indices only, see closeness_centrality
+    """
+    n = len(csr.nodes)
+    centrality = np.zeros((len(sources),), dtype=np.float64)
+    for start in range(0, len(sources), 64):
+        batch = slice(start, start + 64)
+        dist_sums, inv_dist_sums, n_reached = _multi_source_bfs_distance_sums(
+            csr, sources[batch]
+        )
+        if harmonic:
+            centrality[batch] = inv_dist_sums
+            continue
+        with np.errstate(divide="ignore", invalid="ignore"):
+            c = np.where(dist_sums > 0, (n_reached - 1) / dist_sums, 0.0)
+        if wf_improved and n > 1:
+            c *= (n_reached - 1) / (n - 1)
+        centrality[batch] = c
+    return centrality
 
-    pass
+
+def _brandes_unweighted(csr: CsrGraph, s: int) -> NDArrayFloat:
+    """
+    Dependencies delta_s(v) of the source s on all the nodes v. Both the BFS
+    and the accumulation are level-synchronous, i.e. all the edges between
+    two consecutive levels are processed at once
+    """
+    n = len(csr.nodes)
+    dist = np.full((n,), -1, dtype=np.int_)
+    sigma = np.zeros((n,), dtype=np.float64)  # number of shortest paths from s
+    dist[s] = 0
+    sigma[s] = 1.0
+    frontier = np.array([s], dtype=np.int_)
+    level_edges = []  # edges of the shortest path DAG between levels d and d + 1
+    d = 0
+    while len(frontier) > 0:
+        src, dst, _ = gather_neighbors(csr, frontier)
+        dst_new = dst[dist[dst] == -1]
+        dist[dst_new] = d + 1
+        on_dag = dist[dst] == d + 1
+        src, dst = src[on_dag], dst[on_dag]
+        sigma += np.bincount(dst, weights=sigma[src], minlength=n)
+        level_edges.append((src, dst))
+        frontier = np.unique(dst_new)
+        d += 1
+
+    delta = np.zeros((n,), dtype=np.float64)
+    for src, dst in reversed(level_edges):
+        delta += np.bincount(
+            src, weights=sigma[src] / sigma[dst] * (1.0 + delta[dst]), minlength=n
+        )
+    delta[s] = 0.0
+    return delta
+
+
+def _brandes_weighted(csr: CsrGraph, s: int) -> NDArrayFloat:
+    n = len(csr.nodes)
+    dist = np.full((n,), np.inf)
+    sigma = np.zeros((n,), dtype=np.float64)
+    preds: list[list[int]] = [[] for _ in range(n)]
+    dist[s] = 0.0
+    sigma[s] = 1.0
+    order = []  # nodes in order of non-decreasing distance from s
+    settled = np.zeros((n,), dtype=bool)
+    queue = [(0.0, s)]
+    while queue:
+        d_v, v = heapq.heappop(queue)
+        if settled[v]:
+            continue
+        settled[v] = True
+        order.append(v)
+        for e in range(csr.indptr[v], csr.indptr[v + 1]):
+            w = csr.indices[e]
+            d_w = d_v + csr.weights[e]
+            if d_w < dist[w]:
+                dist[w] = d_w
+                sigma[w] = sigma[v]
+                preds[w] = [v]
+                heapq.heappush(queue, (d_w, w))
+            elif d_w == dist[w]:
+                sigma[w] += sigma[v]
+                preds[w].append(v)
+
+    delta = np.zeros((n,), dtype=np.float64)
+    for w in reversed(order):
+        for v in preds[w]:
+            delta[v] += sigma[v] / sigma[w] * (1.0 + delta[w])
+    delta[s] = 0.0
+    return delta
+
+
+_worker_csr: Optional[CsrGraph] = None
+
+
+def _init_worker(csr: CsrGraph) -> None:
+    # The graph is sent to each worker process once rather than with each task
+    global _worker_csr
+    _worker_csr = csr
+
+
+def _accumulate_dependencies(
+    sources: NDArrayInt, weighted: bool, csr: Optional[CsrGraph] = None
+) -> NDArrayFloat:
+    csr = _worker_csr if csr is None else csr
+    brandes = _brandes_weighted if weighted else _brandes_unweighted
+    bc = np.zeros((len(csr.nodes),), dtype=np.float64)
+    for s in sources:
+        bc += brandes(csr, s)
+    return bc
+
+
+def betweenness_centrality(
+    G: AnyNxGraph,
+    k: Optional[int] = None,
+    weight: Optional[str] = None,
+    n_workers: int = 1,
+    seed: Optional[int] = None,
+) -> dict[Any, float]:
+    """
+    Normalized betweenness centrality computed via Brandes' algorithm:
+    for each source s, a BFS (or Dijkstra if weight is given) counts
+    the shortest paths from s, and the dependencies of s on all the nodes
+    are accumulated backwards along the shortest path DAG.
+
+    If k is given, only k random sources are used and the result is rescaled,
+    see betweenness_error_bound for the accuracy of this approximation.
+    Sources are split among n_workers processes, each returning the sum
+    of the dependencies over its sources
+    """
+    csr = to_csr(G, weight=weight)
+    n = len(csr.nodes)
+    if k is None:
+        sources = np.arange(n)
+    else:
+        rng = np.random.default_rng(seed)
+        sources = rng.choice(n, size=k, replace=False)
+
+    weighted = weight is not None
+    if n_workers == 1:
+        bc = _accumulate_dependencies(sources, weighted, csr)
+    else:
+        with ProcessPoolExecutor(
+            max_workers=n_workers, initializer=_init_worker, initargs=(csr,)
+        ) as executor:
+            partial_bcs = executor.map(
+                _accumulate_dependencies,
+                np.array_split(sources, n_workers),
+                [weighted] * n_workers,
+            )
+            bc = np.sum(list(partial_bcs), axis=0)
+
+    if n > 2:
+        bc *= 1.0 / ((n - 1) * (n - 2))
+    if k is not None:
+        bc *= n / k
+    return dict(zip(csr.nodes, bc.tolist()))
+
+
+def betweenness_error_bound(n: int, k: int, alpha: float = 0.05) -> float:
+    """
+    With probability at least 1 - alpha, the normalized betweenness centralities
+    of all the n nodes estimated from k sampled sources are within the returned
+    bound of the exact values. Each sampled source contributes a value within
+    [0, n / (n - 1)] to the estimate, so the bound follows from Hoeffding's
+    inequality and the union bound over the nodes
+    """
+    return n / (n - 1) * np.sqrt(np.log(2 * n / alpha) / (2 * k))
+
+
+def _aitken_extrapolation(
+    x_0: NDArrayFloat, x_1: NDArrayFloat, x_2: NDArrayFloat
+) -> NDArrayFloat:
+    """
+    Componentwise Aitken's delta-squared extrapolation of three consecutive
+    iterates. Components with a vanishing second difference are kept as is
+    """
+    denom = x_2 - 2.0 * x_1 + x_0
+    safe = np.abs(denom) > 1e-14 * np.abs(x_2).max()
+    x = x_2.copy()
+    x[safe] -= (x_2[safe] - x_1[safe]) ** 2 / denom[safe]
+    return np.maximum(x, 0.0)  # both centralities are non-negative
+
+
+def power_iteration(
+    apply: Callable[[NDArrayFloat], NDArrayFloat],
+    normalize: Callable[[NDArrayFloat], NDArrayFloat],
+    x_0: NDArrayFloat,
+    tol: float = 1.0e-6,
+    max_iter: int = 1000,
+    aitken_every: Optional[int] = None,
+) -> tuple[NDArrayFloat, int]:
+    """
+    Iterates x <- normalize(apply(x)) until the L1 change drops below n * tol
+    (the same criterion as in networkx). If aitken_every is set, the last three
+    iterates are extrapolated via Aitken's method every aitken_every iterations.
+    Extrapolation removes the contribution of the second largest eigenvalue
+    only if a single eigenvalue dominates the error, otherwise it may slow
+    the convergence down. So the extrapolated vector is accepted only if its
+    residual ||normalize(apply(y)) - y|| is smaller than that of the plain
+    iterate, which costs two extra products per attempt. Returns the vector
+    and the number of iterations
+    """
+    n = len(x_0)
+    x = normalize(x_0)
+    x_prev = None
+    for i in range(1, max_iter + 1):
+        x_new = normalize(apply(x))
+        if aitken_every and i % aitken_every == 0 and x_prev is not None:
+            y = normalize(_aitken_extrapolation(x_prev, x, x_new))
+            residual_y = np.abs(normalize(apply(y)) - y).sum()
+            residual_plain = np.abs(normalize(apply(x_new)) - x_new).sum()
+            if residual_y < residual_plain:
+                x_new = y
+        if np.abs(x_new - x).sum() < n * tol:
+            return x_new, i
+        x_prev, x = x, x_new
+    raise nx.PowerIterationFailedConvergence(max_iter)
+
+
+def _initial_vector(
+    nodes: list[Any], x_0: Optional[dict[Any, float]]
+) -> NDArrayFloat:
+    """
+    Warm start from a previous result. New nodes get the mean value
+    """
+    if x_0 is None:
+        return np.ones((len(nodes),), dtype=np.float64)
+    mean = np.mean(list(x_0.values())) if x_0 else 1.0
+    return np.array([x_0.get(node, mean) for node in nodes], dtype=np.float64)
+
+
+def eigenvector_centrality(
+    G: AnyNxGraph,
+    tol: float = 1.0e-6,
+    max_iter: int = 1000,
+    x_0: Optional[dict[Any, float]] = None,
+    weight: Optional[str] = None,
+    aitken_every: Optional[int] = None,
+) -> dict[Any, float]:
+    """
+    Principal eigenvector of the adjacency matrix found via sparse power
+    iteration. Similarly to networkx, we iterate with A^T + I, which has
+    the same eigenvectors, to avoid oscillations on bipartite graphs.
+    Previously computed centralities can be passed as x_0 for a warm start
+    """
+    nodes = list(G.nodes)
+    A = nx.to_scipy_sparse_array(G, nodelist=nodes, weight=weight, format="csr")
+    A_T = A.T.tocsr()
+    x, _ = power_iteration(
+        apply=lambda x: A_T @ x + x,
+        normalize=lambda x: x / np.linalg.norm(x),
+        x_0=_initial_vector(nodes, x_0),
+        tol=tol,
+        max_iter=max_iter,
+        aitken_every=aitken_every,
+    )
+    return dict(zip(nodes, x.tolist()))
+
+
+def pagerank(
+    G: AnyNxGraph,
+    alpha: float = 0.85,
+    tol: float = 1.0e-6,
+    max_iter: int = 1000,
+    x_0: Optional[dict[Any, float]] = None,
+    weight: Optional[str] = None,
+    aitken_every: Optional[int] = None,
+) -> dict[Any, float]:
+    """
+    PageRank computed by the same power iteration engine. The random surfer
+    follows an outgoing edge with probability alpha or teleports to a random
+    node otherwise. Dangling nodes (without outgoing edges) teleport always
+    """
+    nodes = list(G.nodes)
+    n = len(nodes)
+    A = nx.to_scipy_sparse_array(G, nodelist=nodes, weight=weight, format="csr")
+    out_degrees = np.asarray(A.sum(axis=1)).reshape(-1)
+    is_dangling = out_degrees == 0
+    inv_out_degrees = np.zeros((n,), dtype=np.float64)
+    inv_out_degrees[~is_dangling] = 1.0 / out_degrees[~is_dangling]
+    P_T = (scipy.sparse.diags_array(inv_out_degrees) @ A).T.tocsr()
+
+    def apply(x: NDArrayFloat) -> NDArrayFloat:
+        teleport = (alpha * x[is_dangling].sum() + (1.0 - alpha)) / n
+        return alpha * (P_T @ x) + teleport
+
+    x, _ = power_iteration(
+        apply=apply,
+        normalize=lambda x: x / x.sum(),
+        x_0=_initial_vector(nodes, x_0),
+        tol=tol,
+        max_iter=max_iter,
+        aitken_every=aitken_every,
+    )
+    return dict(zip(nodes, x.tolist()))
 
 
 def plot_centrality_measure(G: AnyNxGraph, measure: CentralityMeasure) -> None:
@@ -54,4 +405,14 @@ if __name__ == "__main__":
     plot_centrality_measure(G, closeness_centrality)
     plot_centrality_measure(G, betweenness_centrality)
     plot_centrality_measure(G, eigenvector_centrality)
+    plot_centrality_measure(G, pagerank)
+
+    # Power iteration only needs sparse matrix-vector products, whereas
+    # computing all the eigenvalues requires a dense matrix and O(n^3) operations
+    A = nx.to_scipy_sparse_array(G, weight=None, format="csr")
+    x = np.array(list(eigenvector_centrality(G, tol=1.0e-10).values()))
+    eigenvalue_power_iteration = x @ (A @ x)  # Rayleigh quotient, ||x|| = 1
+    eigenvalue_numpy = np.max(np.abs(get_numpy_eigenvalues(A.toarray())))
+    print(f"Largest eigenvalue via power iteration: {eigenvalue_power_iteration:.6f}")
+    print(f"Largest eigenvalue via numpy: {eigenvalue_numpy:.6f}")
 
@@ -0,0 +1,266 @@
+from time import perf_counter
+from typing import Any, Iterable
+
+import numpy as np
+import networkx as nx
+import scipy.sparse
+
+from practicum_3.homework.centrality_measures import closeness_of_sources
+from practicum_4.bfs_solved import direction_optimizing_bfs
+from src.common import AnyNxGraph, NDArrayInt, NDArrayFloat
+from src.csr import CsrGraph, to_csr, transpose_csr
+
+
+Edge = tuple[Any, Any]
+
+
+def _update_csr(csr: CsrGraph, removed: NDArrayInt, added: NDArrayInt) -> CsrGraph:
+    """
+    Removes and inserts arcs given as arrays of shape (k, 2) of node indices
+    keeping the rows sorted. Arcs are encoded as keys row * n + column, which
+    are sorted in the CSR layout, so both operations are a searchsorted
+    followed by np.delete or np.insert, i.e. O(m) vectorized work instead of
+    rebuilding the arrays from the networkx graph. Nodes appended
+    to csr.nodes get empty rows
+    """
+    n = len(csr.nodes)
+    n_old = len(csr.indptr) - 1
+    rows = np.repeat(np.arange(n_old), np.diff(csr.indptr))
+    keys = rows * n + csr.indices
+    if len(removed) > 0:
+        keys = np.delete(keys, np.searchsorted(keys, np.sort(removed[:, 0] * n + removed[:, 1])))
+    if len(added) > 0:
+        new_keys = np.sort(added[:, 0] * n + added[:, 1])
+        keys = np.insert(keys, np.searchsorted(keys, new_keys), new_keys)
+    indptr = np.zeros((n + 1,), dtype=np.int_)
+    np.cumsum(np.bincount(keys // n, minlength=n), out=indptr[1:])
+    return CsrGraph(
+        indptr=indptr,
+        indices=keys % n,
+        weights=np.ones((len(keys),), dtype=np.float64),
+        nodes=csr.nodes,
+    )
+
+
+def _eigenvector_by_residual(
+    A_T: scipy.sparse.csr_array, x_0: NDArrayFloat, tol: float, max_iter: int = 1000
+) -> NDArrayFloat:
+    """
+    Power iteration with A^T + I (see eigenvector_centrality) stopped once
+    the residual ||A^T x - lambda x||_inf, lambda being the Rayleigh quotient,
+    drops below tol * lambda. Unlike the step size, the residual does not
+    depend on how close the initial vector is, so a warm start converges
+    to the same accuracy as a cold one
+    """
+    x = x_0 / np.linalg.norm(x_0)
+    for _ in range(max_iter):
+        y = A_T @ x
+        lam = float(x @ y)
+        if np.abs(y - lam * x).max() <= tol * max(lam, 1.0):
+            return x
+        y += x
+        x = y / np.linalg.norm(y)
+    raise nx.PowerIterationFailedConvergence(max_iter)
+
+
+def _shortcut(dist_u: NDArrayFloat, dist_v: NDArrayFloat) -> NDArrayInt:
+    # Nodes unreachable from u become reachable if they are reachable from v
+    return dist_u > dist_v + 1
+
+
+def _grown(dist_before: NDArrayFloat, dist_after: NDArrayFloat) -> NDArrayInt:
+    return dist_after > dist_before
+
+
+class IncrementalCentrality:
+    """
+    Keeps degree, closeness and eigenvector centralities of an unweighted graph
+    up to date under edge insertions and deletions. The graph passed
+    to the constructor is modified in place by apply_edges(), while the CSR
+    arrays of the graph (and of the reversed graph if it is directed) are
+    patched by _update_csr instead of being rebuilt.
+
+    Closeness of node t depends on the distances from all the nodes to t.
+    Shortest paths to u never use an edge u -> v, so if d(u, t) does not change
+    after the edge is inserted or deleted, neither does any d(s, t) since
+    the paths through u -> v can be replaced by the paths through u. Hence
+    t is affected if and only if
+    * (insertion) d(u, t) > d(v, t) + 1, i.e. the new edge gives a shortcut,
+      found by two BFS from u and v
+    * (deletion) d(u, t) grows, found by BFS from u before and after
+      the deletion (the shortest paths from v never use u -> v, so checking
+      d(v, t) too is only needed for undirected edges but harmless)
+    and closeness is recomputed only for the affected nodes. BFS run over
+    the CSR arrays. Undirected edges are checked in both directions. Once more
+    than max_affected_fraction of the nodes are affected, the search stops
+    and closeness is recomputed for all the nodes instead.
+
+    Eigenvector centrality is recomputed by power iteration warm-started from
+    the previous vector and stopped on the residual, see _eigenvector_by_residual.
+    Removing missing edges and adding existing ones are ignored
+    """
+    def __init__(
+        self, G: AnyNxGraph, tol: float = 1.0e-6, max_affected_fraction: float = 0.5
+    ) -> None:
+        self.G: AnyNxGraph = G
+        self.tol = tol
+        self.max_affected_fraction = max_affected_fraction
+        self.csr: CsrGraph = to_csr(G)
+        self.csr_in: CsrGraph = transpose_csr(self.csr) if G.is_directed() else self.csr
+        self.node_to_idx: dict[Any, int] = {node: i for i, node in enumerate(self.csr.nodes)}
+        self.degree: dict[Any, int] = dict(G.degree())
+        n = len(self.csr.nodes)
+        self._closeness: NDArrayFloat = closeness_of_sources(self.csr, np.arange(n))
+        self._eigenvector: NDArrayFloat = _eigenvector_by_residual(
+            self._adjacency_transposed(), np.ones((n,)), tol
+        )
+        self.n_affected = 0  # number of nodes whose closeness was recomputed
+
+    @property
+    def nodes(self) -> list[Any]:
+        return self.csr.nodes
+
+    @property
+    def closeness(self) -> dict[Any, float]:
+        return dict(zip(self.nodes, self._closeness.tolist()))
+
+    @property
+    def eigenvector(self) -> dict[Any, float]:
+        return dict(zip(self.nodes, self._eigenvector.tolist()))
+
+    def apply_edges(
+        self, added: Iterable[Edge], removed: Iterable[Edge]
+    ) -> dict[str, dict[Any, float]]:
+        n_nodes_before = len(self.nodes)
+        affected = np.zeros((n_nodes_before,), dtype=bool)
+        full_recompute = False
+        for u, v in removed:
+            if not self.G.has_edge(u, v):
+                continue
+            if not full_recompute:
+                dist_before = self._distances_from(u, v)
+            self.G.remove_edge(u, v)
+            self._update_arcs(u, v, inserted=False)
+            self._update_degree(u, v, -1)
+            if not full_recompute:
+                for d_before, d_after in zip(dist_before, self._distances_from(u, v)):
+                    affected |= _grown(d_before, d_after)
+                full_recompute = affected.sum() > self.max_affected_fraction * len(affected)
+        for u, v in added:
+            if self.G.has_edge(u, v):
+                continue
+            if not full_recompute and u in self.node_to_idx and v in self.node_to_idx:
+                dist_u, dist_v = self._distances_from(u, v)
+                affected |= _shortcut(dist_u, dist_v)
+                if not self.G.is_directed():
+                    affected |= _shortcut(dist_v, dist_u)
+                full_recompute = affected.sum() > self.max_affected_fraction * len(affected)
+            self.G.add_edge(u, v)
+            self._update_arcs(u, v, inserted=True)
+            self._update_degree(u, v, +1)
+
+        n = len(self.nodes)
+        if full_recompute or n != n_nodes_before:
+            # Normalization of closeness depends on the number of nodes
+            self._closeness = closeness_of_sources(self.csr, np.arange(n))
+            self.n_affected = n
+        else:
+            sources = np.flatnonzero(affected)
+            if len(sources) > 0:
+                self._closeness[sources] = closeness_of_sources(self.csr, sources)
+            self.n_affected = len(sources)
+
+        # New nodes get the mean value
+        x_0 = np.full((n,), self._eigenvector.mean() if n_nodes_before else 1.0)
+        x_0[:n_nodes_before] = self._eigenvector
+        self._eigenvector = _eigenvector_by_residual(self._adjacency_transposed(), x_0, self.tol)
+        return dict(
+            degree=self.degree, closeness=self.closeness, eigenvector=self.eigenvector
+        )
+
+    def _adjacency_transposed(self) -> scipy.sparse.csr_array:
+        # Row i of the reversed graph holds the predecessors of node i
+        n = len(self.nodes)
+        return scipy.sparse.csr_array(
+            (self.csr_in.weights, self.csr_in.indices, self.csr_in.indptr), shape=(n, n)
+        )
+
+    def _distances_from(self, u: Any, v: Any) -> tuple[NDArrayFloat, NDArrayFloat]:
+        # BFS distances from u and v with inf for unreachable nodes
+        dists = []
+        for node in (u, v):
+            dist = direction_optimizing_bfs(
+                self.csr, self.node_to_idx[node], csr_in=self.csr_in
+            ).dist.astype(np.float64)
+            dist[dist == -1] = np.inf
+            dists.append(dist)
+        return dists[0], dists[1]
+
+    def _update_arcs(self, u: Any, v: Any, inserted: bool) -> None:
+        for node in (u, v):
+            if node not in self.node_to_idx:
+                self.node_to_idx[node] = len(self.nodes)
+                self.nodes.append(node)
+        u_idx, v_idx = self.node_to_idx[u], self.node_to_idx[v]
+        arcs = [(u_idx, v_idx)]
+        if not self.G.is_directed() and u_idx != v_idx:
+            arcs.append((v_idx, u_idx))
+        arcs = np.array(arcs, dtype=np.int_)
+        no_arcs = np.empty((0, 2), dtype=np.int_)
+        removed, added = (no_arcs, arcs) if inserted else (arcs, no_arcs)
+        self.csr = _update_csr(self.csr, removed, added)
+        if self.G.is_directed():
+            self.csr_in = _update_csr(self.csr_in, removed[:, ::-1], added[:, ::-1])
+        else:
+            self.csr_in = self.csr
+
+    def _update_degree(self, u: Any, v: Any, increment: int) -> None:
+        for node in (u, v):
+            self.degree[node] = self.degree.get(node, 0) + increment
+
+
+if __name__ == "__main__":
+    seed = 42
+    rng = np.random.default_rng(seed)
+    tol = 1.0e-8
+
+    # A single update typically affects a fraction of the nodes, but a shortcut
+    # between distant parts of the graph may trigger a full recomputation
+    for name, G in (
+        ("Barabasi-Albert", nx.barabasi_albert_graph(n=5000, m=3, seed=seed)),
+        ("random geometric", nx.random_geometric_graph(n=3000, radius=0.04, seed=seed)),
+    ):
+        print(name)
+        inc = IncrementalCentrality(G, tol=tol)
+        for step in range(5):
+            # A few edges change per update
+            edges = list(G.edges)
+            removed = [edges[i] for i in rng.choice(len(edges), size=2, replace=False)]
+            u = int(rng.integers(G.number_of_nodes()))
+            added = [(u, int(rng.choice(list(nx.ego_graph(G, u, radius=3)))))]
+            added = [e for e in added if e[0] != e[1] and not G.has_edge(*e)]
+
+            t_start = perf_counter()
+            res = inc.apply_edges(added, removed)
+            t_incremental = perf_counter() - t_start
+
+            # Full recomputation from scratch with the same stopping criteria
+            t_start = perf_counter()
+            csr = to_csr(G)
+            closeness = closeness_of_sources(csr, np.arange(len(csr.nodes)))
+            A_T = scipy.sparse.csr_array(
+                (csr.weights, csr.indices, csr.indptr), shape=(len(csr.nodes),) * 2
+            ).T.tocsr()
+            eigenvector = _eigenvector_by_residual(A_T, np.ones((len(csr.nodes),)), tol)
+            t_full = perf_counter() - t_start
+
+            closeness_err = max(abs(res["closeness"][v] - c) for v, c in zip(csr.nodes, closeness))
+            eigenvector_err = max(
+                abs(res["eigenvector"][v] - x) for v, x in zip(csr.nodes, eigenvector)
+            )
+            print(
+                f"Update #{step + 1}: {inc.n_affected} affected nodes, "
+                f"incremental: {t_incremental:.3f} s, full: {t_full:.3f} s, "
+                f"closeness error: {closeness_err:.1e}, "
+                f"eigenvector error: {eigenvector_err:.1e}"
+            )
@@ -1,34 +1,200 @@
 from pathlib import Path
-from collections import deque
-from typing import Any
+from collections import deque, namedtuple
+from time import perf_counter
+from typing import Any, Iterator, Optional
 from abc import ABC, abstractmethod
 
+import numpy as np
 import networkx as nx
 
 from practicum_4.dfs import GraphTraversal 
+from practicum_4.dfs_solved import (
+    BatchedGraphTraversal,
+    TraversalEvents,
+    PREVISIT,
+    POSTVISIT,
+)
 from src.plotting.graphs import plot_graph
-from src.common import AnyNxGraph
+from src.common import AnyNxGraph, NDArrayInt
+from src.csr import CsrGraph, gather_neighbors, to_csr, transpose_csr
+
+
+# dist[i] is the number of edges on a shortest path from the source to node i
+# and parent[i] is the previous node on this path (-1 for unreachable nodes,
+# the source is its own parent)
+BfsResult = namedtuple("BfsResult", "dist, parent")
 
 
 class BfsViaFifoQueue(GraphTraversal):
     def run(self, node: Any) -> None:
-        queue = deque()  # (node, processed_flag), processed is for postvisit
+        queue = deque()
         self.visited.add(node)
         self.previsit(node)
         queue.append(node)
 
         while len(queue) > 0:
-            node, processed = queue.popleft()
+            node = queue.popleft()
 
             for neigh in self.G.neighbors(node):
                 if neigh not in self.visited:
                     self.visited.add(neigh)
                     self.previsit(neigh)
-                    queue.appendleft(neigh))
+                    queue.append(neigh)
 
             self.postvisit(node)
 
 
+def _top_down_step(
+    csr: CsrGraph, frontier: NDArrayInt, dist: NDArrayInt, parent: NDArrayInt, depth: int
+) -> NDArrayInt:
+    """
+    Expands the whole frontier at once: gathers all the edges going out of it
+    and keeps the first edge reaching each unvisited node
+    """
+    src, dst, _ = gather_neighbors(csr, frontier)
+    is_new = dist[dst] == -1
+    new_nodes, first_edge = np.unique(dst[is_new], return_index=True)
+    dist[new_nodes] = depth
+    parent[new_nodes] = src[is_new][first_edge]
+    return new_nodes
+
+
+def _bottom_up_step(
+    csr_in: CsrGraph,
+    in_frontier: np.ndarray,
+    unvisited: NDArrayInt,
+    dist: NDArrayInt,
+    parent: NDArrayInt,
+    depth: int,
+    max_probes: int = 8,
+) -> NDArrayInt:
+    """
+    Each unvisited node looks for a predecessor in the frontier. Nodes probe
+    their k-th predecessor in the k-th round and leave once a parent is found,
+    which mimics the early exit of the sequential bottom-up step. After
+    max_probes rounds, the remaining predecessors are checked all at once
+    """
+    starts = csr_in.indptr[unvisited]
+    degrees = csr_in.indptr[unvisited + 1] - starts
+    candidates = np.arange(len(unvisited))
+    found = []
+    for k in range(max_probes):
+        candidates = candidates[degrees[candidates] > k]
+        if len(candidates) == 0:
+            break
+        preds = csr_in.indices[starts[candidates] + k]
+        hit = in_frontier[preds]
+        parent[unvisited[candidates[hit]]] = preds[hit]
+        found.append(candidates[hit])
+        candidates = candidates[~hit]
+    candidates = candidates[degrees[candidates] > max_probes]
+    if len(candidates) > 0:
+        # Skip the predecessors already probed
+        rest = unvisited[candidates]
+        src, preds, _ = gather_neighbors(csr_in, rest)
+        offsets = np.arange(len(src)) - np.repeat(
+            np.cumsum(degrees[candidates]) - degrees[candidates], degrees[candidates]
+        )
+        hit = in_frontier[preds] & (offsets >= max_probes)
+        hit_nodes, first_edge = np.unique(src[hit], return_index=True)
+        parent[hit_nodes] = preds[hit][first_edge]
+        found.append(np.searchsorted(unvisited, hit_nodes))
+    new_nodes = unvisited[np.sort(np.concatenate(found))] if found else unvisited[:0]
+    dist[new_nodes] = depth
+    return new_nodes
+
+
+def direction_optimizing_bfs(
+    csr: CsrGraph,
+    source: int,
+    csr_in: Optional[CsrGraph] = None,
+    alpha: float = 14.0,
+    beta: float = 24.0,
+) -> BfsResult:
+    """
+    Level-synchronous BFS from node index source which switches between
+    top-down and bottom-up steps (Beamer et al., 2012). Top-down steps examine
+    the edges going out of the frontier, which is cheap for small frontiers.
+    Bottom-up steps examine the edges coming into the unvisited nodes, which is
+    cheap when the frontier is large since most unvisited nodes quickly find
+    a parent in it. We switch to bottom-up once the frontier has more than
+    1/alpha of the edges of unvisited nodes and back to top-down once
+    the frontier has less than 1/beta of the nodes.
+
+    csr_in is the transposed graph needed for bottom-up steps. By default,
+    it is computed by transpose_csr before the first bottom-up step. For
+    undirected graphs, the transposed graph is the graph itself, so csr can
+    be passed as csr_in to skip the transposition
+    """
+    n = len(csr.indptr) - 1
+    out_degrees = np.diff(csr.indptr)
+    dist = np.full((n,), -1, dtype=np.int_)
+    parent = np.full((n,), -1, dtype=np.int_)
+    dist[source] = 0
+    parent[source] = source
+    frontier = np.array([source], dtype=np.int_)
+    n_unvisited_edges = len(csr.indices) - int(out_degrees[source])
+    bottom_up = False
+    depth = 0
+    while len(frontier) > 0:
+        depth += 1
+        n_frontier_edges = int(out_degrees[frontier].sum())
+        if not bottom_up and n_frontier_edges > n_unvisited_edges / alpha:
+            bottom_up = True
+        elif bottom_up and len(frontier) < n / beta:
+            bottom_up = False
+
+        if bottom_up:
+            if csr_in is None:
+                csr_in = transpose_csr(csr)
+            in_frontier = np.zeros((n,), dtype=bool)
+            in_frontier[frontier] = True
+            unvisited = np.flatnonzero(dist == -1)
+            frontier = _bottom_up_step(csr_in, in_frontier, unvisited, dist, parent, depth)
+        else:
+            frontier = _top_down_step(csr, frontier, dist, parent, depth)
+        n_unvisited_edges -= int(out_degrees[frontier].sum())
+    return BfsResult(dist=dist, parent=parent)
+
+
+class LevelSynchronousBfs(BatchedGraphTraversal):
+    """
+    BFS emitting the events level by level: previsit events for all the nodes
+    discovered from the frontier followed by postvisit events for the frontier
+    """
+    def iter_events(self, node: Any) -> Iterator[TraversalEvents]:
+        source = self.node_to_idx[node]
+        if self.visited[source]:
+            return
+        self.visited[source] = True
+        frontier = np.array([source], dtype=np.int_)
+        frontier_parents = np.array([-1], dtype=np.int_)
+        yield from self._split(frontier, PREVISIT, 0, frontier_parents)
+        depth = 0
+        while len(frontier) > 0:
+            src, dst, _ = gather_neighbors(self.csr, frontier)
+            is_new = ~self.visited[dst]
+            new_nodes, first_edge = np.unique(dst[is_new], return_index=True)
+            new_parents = src[is_new][first_edge]
+            self.visited[new_nodes] = True
+            yield from self._split(new_nodes, PREVISIT, depth + 1, new_parents)
+            yield from self._split(frontier, POSTVISIT, depth, frontier_parents)
+            frontier, frontier_parents = new_nodes, new_parents
+            depth += 1
+
+    def _split(
+        self, nodes: NDArrayInt, event: int, depth: int, parents: NDArrayInt
+    ) -> Iterator[TraversalEvents]:
+        for start in range(0, len(nodes), self.batch_size):
+            batch = nodes[start : start + self.batch_size]
+            yield TraversalEvents(
+                node=batch,
+                event=np.full_like(batch, event),
+                depth=np.full_like(batch, depth),
+                parent=parents[start : start + self.batch_size],
+            )
+
+
 class BfsViaLifoQueueWithPrinting(BfsViaFifoQueue):
     def previsit(self, node: Any, **params) -> None:
         print(f"Previsit node {node}")
@@ -53,3 +219,52 @@ if __name__ == "__main__":
 
     plot_graph(G)
 
+    # Level-synchronous BFS on a large scale-free graph. Middle levels contain
+    # most of the nodes, so bottom-up steps are used there
+    G = nx.barabasi_albert_graph(n=200_000, m=5, seed=42)
+    csr = to_csr(G)
+    t_start = perf_counter()
+    res = direction_optimizing_bfs(csr, source=0, csr_in=csr)  # undirected graph
+    t_bfs = perf_counter() - t_start
+    t_start = perf_counter()
+    dist_nx = nx.single_source_shortest_path_length(G, 0)
+    t_nx = perf_counter() - t_start
+    dist_nx = np.array([dist_nx[node] for node in csr.nodes])
+    print(
+        f"Direction-optimizing BFS: {t_bfs:.2f} s, networkx: {t_nx:.2f} s, "
+        f"distances match: {np.array_equal(res.dist, dist_nx)}"
+    )
+
+    # For directed graphs, bottom-up steps follow the reversed edges
+    G_directed = nx.gnm_random_graph(n=200_000, m=2_000_000, seed=42, directed=True)
+    csr_directed = to_csr(G_directed)
+    res_directed = direction_optimizing_bfs(csr_directed, source=0)
+    dist_directed_nx = nx.single_source_shortest_path_length(G_directed, 0)
+    dist_directed_nx = np.array(
+        [dist_directed_nx.get(node, -1) for node in csr_directed.nodes]
+    )
+    print(
+        f"Directed graph, distances match: "
+        f"{np.array_equal(res_directed.dist, dist_directed_nx)}"
+    )
+
+    # The same traversal with a batched visitor
+    class BatchedDepthCounter(LevelSynchronousBfs):
+        def __init__(self, G: AnyNxGraph) -> None:
+            super().__init__(G)
+            self.depth_counts: NDArrayInt = np.zeros((len(self.nodes),), dtype=np.int_)
+
+        def on_batch(self, events: TraversalEvents) -> None:
+            depths = events.depth[events.event == PREVISIT]
+            self.depth_counts += np.bincount(depths, minlength=len(self.depth_counts))
+
+    visitor = BatchedDepthCounter(G)
+    t_start = perf_counter()
+    visitor.run(node=0)
+    t_bfs = perf_counter() - t_start
+    depth_counts_nx = np.bincount(dist_nx, minlength=len(dist_nx))
+    print(
+        f"Batched BFS visitor: {t_bfs:.2f} s, "
+        f"depth counts match: {np.array_equal(visitor.depth_counts, depth_counts_nx)}"
+    )
+
@@ -0,0 +1,203 @@
+from collections import namedtuple
+from time import perf_counter
+
+import numpy as np
+import networkx as nx
+
+from practicum_4.dfs_solved import DfsViaArrayStack, TraversalEvents, PREVISIT, POSTVISIT
+from src.common import AnyNxGraph, NDArrayInt
+from src.csr import gather_neighbors
+
+
+# bridges is an array of shape (n_bridges, 2) and articulation_points is
+# an array of shape (n_articulation_points,), both contain node indices
+BiconnectivityReport = namedtuple("BiconnectivityReport", "bridges, articulation_points")
+
+
+class PostorderCollector(DfsViaArrayStack):
+    def __init__(self, G: AnyNxGraph) -> None:
+        self.order: list[NDArrayInt] = []
+        super().__init__(G)
+
+    def reset(self) -> None:
+        super().reset()
+        self.order.clear()
+
+    def on_batch(self, events: TraversalEvents) -> None:
+        self.order.append(events.node[events.event == POSTVISIT])
+
+    def postorder(self) -> NDArrayInt:
+        for i in range(len(self.nodes)):
+            if not self.visited[i]:
+                self.run(self.nodes[i])
+        return np.concatenate(self.order)
+
+
+class ComponentLabeling(DfsViaArrayStack):
+    def __init__(self, G: AnyNxGraph) -> None:
+        self.labels: NDArrayInt = np.full((G.number_of_nodes(),), -1, dtype=np.int_)
+        self.n_components = 0
+        super().__init__(G)
+
+    def reset(self) -> None:
+        super().reset()
+        self.labels[:] = -1
+        self.n_components = 0
+
+    def on_batch(self, events: TraversalEvents) -> None:
+        self.labels[events.node[events.event == PREVISIT]] = self.n_components
+
+    def label(self, order: NDArrayInt) -> NDArrayInt:
+        """
+        Runs DFS from each unvisited node taken in the given order and labels
+        the nodes reached from it as a new component
+        """
+        for i in order.tolist():
+            if not self.visited[i]:
+                self.run(self.nodes[i])
+                self.n_components += 1
+        return self.labels
+
+
+def strongly_connected_components(G: nx.DiGraph) -> NDArrayInt:
+    """
+    Kosaraju's algorithm: the node finishing last in DFS over G belongs
+    to a source component of the condensation, i.e. a sink component of
+    the reversed graph, so DFS over the reversed graph started from it
+    reaches exactly its component. Repeating in the reverse postorder
+    gives all the components. Both DFS are iterative, so the depth of
+    the graph is not limited by the recursion limit.
+
+    Returns labels[i], the component of the i-th node in G.nodes. Components
+    are numbered in topological order of the condensation
+    """
+    postorder = PostorderCollector(G).postorder()
+    return ComponentLabeling(G.reverse(copy=False)).label(postorder[::-1])
+
+
+class LowlinkCollector(DfsViaArrayStack):
+    """
+    Collects from each batch of DFS events the discovery times, parents and
+    subtree sizes of the nodes. When a node is finished, all its neighbors
+    are discovered, so the smallest discovery time among them except
+    the parent (back_low) is found for the whole batch at once by gathering
+    the neighbor arrays
+    """
+    def __init__(self, G: AnyNxGraph) -> None:
+        n = G.number_of_nodes()
+        self.disc: NDArrayInt = np.full((n,), -1, dtype=np.int_)
+        self.parent: NDArrayInt = np.full((n,), -1, dtype=np.int_)
+        self.subtree_size: NDArrayInt = np.zeros((n,), dtype=np.int_)
+        self.back_low: NDArrayInt = np.zeros((n,), dtype=np.int_)
+        self.n_discovered = 0
+        super().__init__(G)
+
+    def reset(self) -> None:
+        super().reset()
+        self.disc[:] = -1
+        self.parent[:] = -1
+        self.subtree_size[:] = 0
+        self.back_low[:] = 0
+        self.n_discovered = 0
+
+    def on_batch(self, events: TraversalEvents) -> None:
+        is_pre = events.event == PREVISIT
+        # Number of nodes discovered before each event
+        n_before = self.n_discovered + np.cumsum(is_pre) - is_pre
+        pre = events.node[is_pre]
+        self.disc[pre] = n_before[is_pre]
+        self.parent[pre] = events.parent[is_pre]
+        self.back_low[pre] = self.disc[pre]
+        self.n_discovered += len(pre)
+
+        post = events.node[~is_pre]
+        self.subtree_size[post] = n_before[~is_pre] - self.disc[post]
+        src, dst, _ = gather_neighbors(self.csr, post)
+        not_parent = dst != self.parent[src]
+        np.minimum.at(self.back_low, src[not_parent], self.disc[dst[not_parent]])
+
+    def collect(self) -> None:
+        for i in range(len(self.nodes)):
+            if not self.visited[i]:
+                self.run(self.nodes[i])
+
+
+def _range_min(values: NDArrayInt, starts: NDArrayInt, lengths: NDArrayInt) -> NDArrayInt:
+    """
+    min(values[s : s + l]) for each s, l in zip(starts, lengths), l > 0.
+    Ranges are split into power-of-two pieces by the bits of their lengths.
+    At step k, level[j] = min(values[j : j + 2^k]), so each step serves
+    all the ranges at once in O(n) time and memory
+    """
+    res = np.full((len(starts),), np.iinfo(values.dtype).max, dtype=values.dtype)
+    pos = starts.copy()
+    level = values
+    k = 0
+    while len(lengths) > 0 and (1 << k) <= lengths.max():
+        take = (lengths >> k) & 1 == 1
+        res[take] = np.minimum(res[take], level[pos[take]])
+        pos[take] += 1 << k
+        level = np.minimum(level[: -(1 << k)], level[1 << k :])
+        k += 1
+    return res
+
+
+def biconnectivity(G: nx.Graph) -> BiconnectivityReport:
+    """
+    Finds bridges and articulation points of an undirected graph via DFS
+    with lowlink values: low[v] is the smallest discovery time reachable
+    from the DFS subtree of v using at most one back edge. A tree edge (p, v) is
+    a bridge if low[v] > disc[p]. A non-root node p is an articulation point
+    if low[v] >= disc[p] for some child v, and the root is an articulation point
+    if it has more than one child.
+
+    Instead of updating low[p] from each child one by one, we use that
+    the subtree of v occupies the discovery times [disc[v], disc[v] + size[v]),
+    so low[v] is the minimum of back_low over this range computed for all
+    the nodes at once. Node indices refer to the order of G.nodes
+    """
+    if G.is_directed():
+        raise ValueError("Biconnectivity is only defined for undirected graphs")
+    collector = LowlinkCollector(G)
+    collector.collect()
+    disc, parent = collector.disc, collector.parent
+    n = len(disc)
+    back_low_by_time = np.empty_like(collector.back_low)
+    back_low_by_time[disc] = collector.back_low
+    low = _range_min(back_low_by_time, disc, collector.subtree_size)
+
+    child = np.flatnonzero(parent != -1)
+    p = parent[child]
+    is_bridge = low[child] > disc[p]
+    is_articulation = np.zeros((n,), dtype=bool)
+    non_root = parent[p] != -1
+    is_articulation[p[non_root & (low[child] >= disc[p])]] = True
+    is_root = parent == -1
+    is_articulation[is_root & (np.bincount(p, minlength=n) > 1)] = True
+    return BiconnectivityReport(
+        bridges=np.stack([p[is_bridge], child[is_bridge]], axis=1),
+        articulation_points=np.flatnonzero(is_articulation),
+    )
+
+
+if __name__ == "__main__":
+    # Long chains of strongly connected cycles are too deep for recursive DFS
+    n_cycles = 20_000
+    G = nx.DiGraph()
+    for i in range(n_cycles):
+        nx.add_cycle(G, [3 * i, 3 * i + 1, 3 * i + 2])
+        G.add_edge(3 * i + 2, 3 * (i + 1))
+    t_start = perf_counter()
+    labels = strongly_connected_components(G)
+    print(
+        f"SCC: {labels.max() + 1} components in {perf_counter() - t_start:.2f} s, "
+        f"networkx: {nx.number_strongly_connected_components(G)}"
+    )
+
+    G = nx.barbell_graph(m1=5, m2=3)
+    nodes = list(G.nodes)
+    report = biconnectivity(G)
+    print(f"Bridges: {[(nodes[u], nodes[v]) for u, v in report.bridges]}")
+    print(f"networkx: {list(nx.bridges(G))}")
+    print(f"Articulation points: {[nodes[i] for i in report.articulation_points]}")
+    print(f"networkx: {list(nx.articulation_points(G))}")
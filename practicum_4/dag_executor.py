@@ -0,0 +1,164 @@
+from collections import namedtuple
+from concurrent.futures import (
+    Executor,
+    Future,
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from functools import partial
+import heapq
+import os
+import time
+from typing import Any, Callable, Literal, Optional
+
+import numpy as np
+import networkx as nx
+
+from practicum_4.dfs_solved import TopologicalSorting
+
+
+PoolType = Literal["thread", "process"]
+# start and end are wall-clock timestamps (seconds since the start of the run)
+TaskTiming = namedtuple("TaskTiming", "start, end")
+# parallelism is the total time spent in the tasks divided by the makespan,
+# i.e. the average number of tasks running simultaneously
+ExecutionReport = namedtuple(
+    "ExecutionReport", "results, timings, makespan, parallelism, critical_path_length"
+)
+
+
+def _timed_call(task: Callable[..., Any], args: tuple) -> tuple[Any, float, float]:
+    # time.time() is used since it is consistent across processes
+    start = time.time()
+    result = task(*args)
+    return result, start, time.time()
+
+
+def topological_order(G: nx.DiGraph) -> list[Any]:
+    """
+    Topological order of all the nodes of a DAG. DFS is started from each
+    unvisited node and the nodes finishing later are put in front
+    """
+    if not nx.is_directed_acyclic_graph(G):
+        raise ValueError("Task graph contains a cycle")
+    ts = TopologicalSorting(G)
+    for node in G.nodes:
+        if node not in ts.visited:
+            ts.run(node)
+    order = list(ts.sorted_nodes)
+    ts.reset()
+    return order
+
+
+def bottom_levels(G: nx.DiGraph, order: list[Any], cost: str = "cost") -> dict[Any, float]:
+    """
+    Bottom level of a task is the length of the longest path from the task
+    to a sink where the length is the sum of the task costs (1 by default).
+    It is computed by DP over the reversed topological order, in the same way
+    as the shortest paths in a DAG
+    """
+    levels: dict[Any, float] = {}
+    for node in reversed(order):
+        successor_level = max((levels[s] for s in G.successors(node)), default=0.0)
+        levels[node] = G.nodes[node].get(cost, 1.0) + successor_level
+    return levels
+
+
+class DagExecutor:
+    """
+    Runs the tasks stored in the nodes of a DAG: node attribute "task" is
+    a callable called with the positional arguments from node attribute "args"
+    (if any). Each edge u -> v means that v depends on u. A task becomes ready
+    when the in-degree counter of its node drops to zero. Among the ready
+    tasks, the one with the largest bottom level is started first, so
+    the tasks on the critical path are never delayed by the others.
+
+    For the process pool, tasks and their arguments must be picklable
+    """
+    def __init__(
+        self, G: nx.DiGraph, pool: PoolType = "thread", max_workers: Optional[int] = None
+    ) -> None:
+        self.G: nx.DiGraph = G
+        self.pool = pool
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.order = topological_order(G)
+        self.priority = bottom_levels(G, self.order)
+
+    def _make_pool(self) -> Executor:
+        if self.pool == "thread":
+            return ThreadPoolExecutor(max_workers=self.max_workers)
+        elif self.pool == "process":
+            return ProcessPoolExecutor(max_workers=self.max_workers)
+        else:
+            raise ValueError(f"Unknown pool type: {self.pool}")
+
+    def run(self) -> ExecutionReport:
+        in_degree = dict(self.G.in_degree())
+        # Ties are broken by the topological order to make scheduling deterministic
+        position = {node: i for i, node in enumerate(self.order)}
+        ready = [(-self.priority[v], position[v], v) for v, d in in_degree.items() if d == 0]
+        heapq.heapify(ready)
+        results: dict[Any, Any] = {}
+        timings: dict[Any, TaskTiming] = {}
+        running: dict[Future, Any] = {}
+        t_start = time.time()
+        with self._make_pool() as executor:
+            while ready or running:
+                # Only max_workers tasks are submitted at once, otherwise the pool
+                # would run them in the order of submission, ignoring priorities
+                while ready and len(running) < self.max_workers:
+                    _, _, node = heapq.heappop(ready)
+                    attrs = self.G.nodes[node]
+                    future = executor.submit(_timed_call, attrs["task"], attrs.get("args", ()))
+                    running[future] = node
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    node = running.pop(future)
+                    results[node], start, end = future.result()
+                    timings[node] = TaskTiming(start=start - t_start, end=end - t_start)
+                    for succ in self.G.successors(node):
+                        in_degree[succ] -= 1
+                        if in_degree[succ] == 0:
+                            heapq.heappush(ready, (-self.priority[succ], position[succ], succ))
+        makespan = time.time() - t_start
+        busy_time = sum(t.end - t.start for t in timings.values())
+        return ExecutionReport(
+            results=results,
+            timings=timings,
+            makespan=makespan,
+            parallelism=busy_time / makespan,
+            critical_path_length=max(self.priority.values(), default=0.0),
+        )
+
+
+def get_random_task_graph(n_tasks: int, p: float, seed: int) -> nx.DiGraph:
+    """
+    Random DAG where tasks sleep for a random time equal to their cost. Edges
+    go from smaller to larger node indices, so there are no cycles
+    """
+    rng = np.random.default_rng(seed)
+    G = nx.gnp_random_graph(n_tasks, p, seed=seed, directed=True)
+    G = nx.DiGraph([(u, v) for u, v in G.edges if u < v])
+    G.add_nodes_from(range(n_tasks))
+    for node in G.nodes:
+        cost = float(rng.uniform(0.01, 0.1))
+        G.nodes[node]["cost"] = cost
+        G.nodes[node]["task"] = partial(time.sleep, cost)
+    return G
+
+
+if __name__ == "__main__":
+    G = get_random_task_graph(n_tasks=100, p=0.05, seed=42)
+    for max_workers in (1, 2, 4, 8):
+        report = DagExecutor(G, pool="thread", max_workers=max_workers).run()
+        print(
+            f"{max_workers} workers: makespan = {report.makespan:.2f} s, "
+            f"critical path = {report.critical_path_length:.2f} s, "
+            f"achieved parallelism = {report.parallelism:.2f}"
+        )
+
+    slowest = sorted(report.timings.items(), key=lambda item: item[1].start - item[1].end)
+    for node, timing in slowest[:5]:
+        print(f"Task {node}: started at {timing.start:.3f} s, took {timing.end - timing.start:.3f} s")
@@ -1,12 +1,22 @@
 from pathlib import Path
-from collections import deque
-from typing import Any
+from collections import deque, namedtuple
+from time import perf_counter
+from typing import Any, Iterator
 from abc import ABC, abstractmethod
 
+import numpy as np
 import networkx as nx
 
 from src.plotting.graphs import plot_graph
-from src.common import AnyNxGraph
+from src.common import AnyNxGraph, NDArrayInt
+from src.csr import to_csr
+
+
+PREVISIT, POSTVISIT = 0, 1
+# Batch of traversal events as arrays of the same length: node indices
+# (see BatchedGraphTraversal.nodes), event types (PREVISIT or POSTVISIT),
+# depths in the traversal tree and parent indices (-1 for roots)
+TraversalEvents = namedtuple("TraversalEvents", "node, event, depth, parent")
 
 
 class GraphTraversal(ABC):
@@ -65,6 +75,103 @@ class DfsViaLifoQueue(GraphTraversal):
                         stack.append((n_neigh, False))
 
 
+class BatchedGraphTraversal(ABC):
+    """
+    Traversal engine which emits events in batches of up to batch_size
+    to on_batch() instead of calling a hook per node. Nodes are referred to
+    by their indices in self.nodes, so that visitors can process batches
+    with numpy. Events can also be consumed as a stream via iter_events().
+
+    By default, on_batch() dispatches events to the per-node hooks previsit()
+    and postvisit(), so visitors written for GraphTraversal work unchanged
+    """
+    def __init__(self, G: AnyNxGraph, batch_size: int = 4096) -> None:
+        self.G: AnyNxGraph = G
+        self.batch_size = batch_size
+        self.csr = to_csr(G)
+        self.nodes: list[Any] = self.csr.nodes
+        self.node_to_idx: dict[Any, int] = {node: i for i, node in enumerate(self.nodes)}
+        self.visited = np.zeros((len(self.nodes),), dtype=bool)
+        self.reset()
+
+    def reset(self) -> None:
+        self.visited[:] = False
+
+    def previsit(self, node: Any, **params) -> None:
+        pass
+
+    def postvisit(self, node: Any, **params) -> None:
+        pass
+
+    def on_batch(self, events: TraversalEvents) -> None:
+        for node, event, depth, parent in zip(*(arr.tolist() for arr in events)):
+            hook = self.previsit if event == PREVISIT else self.postvisit
+            hook(
+                self.nodes[node],
+                depth=depth,
+                parent=None if parent == -1 else self.nodes[parent],
+            )
+
+    @abstractmethod
+    def iter_events(self, node: Any) -> Iterator[TraversalEvents]:
+        pass
+
+    def run(self, node: Any) -> None:
+        for events in self.iter_events(node):
+            self.on_batch(events)
+
+    def _make_batch(self, buffer: list[tuple[int, int, int, int]]) -> TraversalEvents:
+        arrays = np.array(buffer, dtype=np.int_).reshape(-1, 4).T
+        return TraversalEvents(*arrays)
+
+
+class DfsViaArrayStack(BatchedGraphTraversal):
+    """
+    Iterative DFS over CSR arrays. The stack stores the position of the next
+    edge to examine for each node, so the events come in the same order
+    as in the recursive DFS
+    """
+    def __init__(self, G: AnyNxGraph, batch_size: int = 4096) -> None:
+        super().__init__(G, batch_size)
+        # Python lists are much faster than numpy arrays for scalar access
+        self._indptr: list[int] = self.csr.indptr.tolist()
+        self._indices: list[int] = self.csr.indices.tolist()
+
+    def iter_events(self, node: Any) -> Iterator[TraversalEvents]:
+        indptr = self._indptr
+        indices = self._indices
+        visited = self.visited
+        source = self.node_to_idx[node]
+        if visited[source]:
+            return
+        visited[source] = True
+        buffer = [(source, PREVISIT, 0, -1)]
+        stack = [source]
+        next_edge = [indptr[source]]
+        while stack:
+            v = stack[-1]
+            e = next_edge[-1]
+            end = indptr[v + 1]
+            while e < end and visited[indices[e]]:
+                e += 1
+            if e < end:
+                w = indices[e]
+                next_edge[-1] = e + 1
+                visited[w] = True
+                buffer.append((w, PREVISIT, len(stack), v))
+                stack.append(w)
+                next_edge.append(indptr[w])
+            else:
+                stack.pop()
+                next_edge.pop()
+                buffer.append((v, POSTVISIT, len(stack), stack[-1] if stack else -1))
+            if len(buffer) >= self.batch_size:
+                yield self._make_batch(buffer)
+                buffer = []
+        if buffer:
+            yield self._make_batch(buffer)
+
+
 class DfsViaRecursionWithPrinting(DfsViaRecursion):
     def previsit(self, node: Any, **params) -> None:
         print(f"Previsit node {node}")
@@ -139,3 +246,28 @@ if __name__ == "__main__":
     print(sorted_nodes)
     plot_graph(G)
 
+    # 4. Batched visitors. Per-node hooks are called via the default on_batch(),
+    # whereas a numpy-friendly visitor processes a whole batch at once
+    class DepthCounter(DfsViaArrayStack):
+        def __init__(self, G: AnyNxGraph) -> None:
+            super().__init__(G)
+            self.depth_counts: NDArrayInt = np.zeros((len(self.nodes),), dtype=np.int_)
+
+        def previsit(self, node: Any, **params) -> None:
+            self.depth_counts[params["depth"]] += 1
+
+    class BatchedDepthCounter(DepthCounter):
+        def on_batch(self, events: TraversalEvents) -> None:
+            depths = events.depth[events.event == PREVISIT]
+            self.depth_counts += np.bincount(depths, minlength=len(self.depth_counts))
+
+    G = nx.barabasi_albert_graph(n=200_000, m=3, seed=42)
+    for visitor_cls in (DepthCounter, BatchedDepthCounter):
+        visitor = visitor_cls(G)
+        t_start = perf_counter()
+        visitor.run(node=0)
+        print(
+            f"{visitor_cls.__name__}: {perf_counter() - t_start:.2f} s, "
+            f"max depth: {np.flatnonzero(visitor.depth_counts)[-1]}"
+        )
+
@@ -0,0 +1,209 @@
+from pathlib import Path
+import tempfile
+from time import perf_counter
+from typing import Any
+
+import numpy as np
+import networkx as nx
+
+from practicum_4.connectivity import strongly_connected_components
+from src.common import AnyNxGraph, NDArrayInt
+
+
+def _condensation_csr(
+    G: nx.DiGraph, labels: NDArrayInt, n_components: int
+) -> tuple[NDArrayInt, NDArrayInt]:
+    """
+    CSR arrays (indptr, indices) of the DAG whose nodes are the strongly
+    connected components of G
+    """
+    node_to_idx = {node: i for i, node in enumerate(G.nodes)}
+    edges = np.array(
+        [(node_to_idx[u], node_to_idx[v]) for u, v in G.edges], dtype=np.int_
+    ).reshape(-1, 2)
+    src, dst = labels[edges[:, 0]], labels[edges[:, 1]]
+    keep = src != dst
+    pairs = np.unique(np.stack([src[keep], dst[keep]], axis=1), axis=0)
+    indptr = np.zeros((n_components + 1,), dtype=np.int_)
+    np.cumsum(np.bincount(pairs[:, 0], minlength=n_components), out=indptr[1:])
+    return indptr, pairs[:, 1].copy()
+
+
+def _tree_cover_postorder(
+    indptr: list[int], indices: list[int], n: int
+) -> tuple[NDArrayInt, NDArrayInt]:
+    """
+    Iterative DFS over a DAG returning the postorder number of each node and
+    the smallest postorder number in its DFS subtree, so that the subtree
+    of node u occupies the interval [low[u], post[u]]
+    """
+    post = np.full((n,), -1, dtype=np.int_)
+    low = np.zeros((n,), dtype=np.int_)
+    visited = [False] * n
+    t = 0
+    for root in range(n):
+        if visited[root]:
+            continue
+        visited[root] = True
+        stack = [root]
+        next_edge = [indptr[root]]
+        subtree_start = [t]
+        while stack:
+            v = stack[-1]
+            e = next_edge[-1]
+            if e < indptr[v + 1]:
+                next_edge[-1] = e + 1
+                w = indices[e]
+                if not visited[w]:
+                    visited[w] = True
+                    stack.append(w)
+                    next_edge.append(indptr[w])
+                    subtree_start.append(t)
+                continue
+            stack.pop()
+            next_edge.pop()
+            low[v] = subtree_start.pop()
+            post[v] = t
+            t += 1
+    return post, low
+
+
+def _merge_intervals(intervals: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    intervals.sort()
+    merged = [intervals[0]]
+    for start, end in intervals[1:]:
+        last_start, last_end = merged[-1]
+        if start <= last_end + 1:
+            merged[-1] = (last_start, max(last_end, end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class ReachabilityIndex:
+    """
+    Answers "can u reach v" queries without traversing the graph.
+    Nodes of a strongly connected component reach the same nodes, so
+    the index is built for the condensation DAG. Each DAG node gets
+    its postorder number in a DFS spanning forest and a list of disjoint
+    intervals of postorder numbers covering all the nodes it reaches: its own
+    subtree interval merged with the intervals of its successors (interval
+    labeling with a tree cover, Agrawal et al., 1989). Then u reaches v
+    iff post[v] lies in one of the intervals of u, which is found by binary
+    search. Components are numbered in topological order, so comparing their
+    numbers rejects many queries in O(1)
+    """
+    def __init__(self, G: AnyNxGraph) -> None:
+        if not G.is_directed():
+            G = G.to_directed()
+        self.nodes: list[Any] = list(G.nodes)
+        self.labels: NDArrayInt = strongly_connected_components(G)
+        n_components = int(self.labels.max()) + 1 if len(self.labels) else 0
+        indptr, indices = _condensation_csr(G, self.labels, n_components)
+        indptr_list, indices_list = indptr.tolist(), indices.tolist()
+        self.post, low = _tree_cover_postorder(indptr_list, indices_list, n_components)
+
+        # Successors have larger component numbers, so they are labeled first
+        intervals: list[list[tuple[int, int]]] = [[] for _ in range(n_components)]
+        for c in reversed(range(n_components)):
+            own = [(int(low[c]), int(self.post[c]))]
+            successors = indices_list[indptr_list[c] : indptr_list[c + 1]]
+            intervals[c] = _merge_intervals(own + [iv for s in successors for iv in intervals[s]])
+        self.interval_ptr = np.zeros((n_components + 1,), dtype=np.int_)
+        np.cumsum([len(ivs) for ivs in intervals], out=self.interval_ptr[1:])
+        flat = np.array([iv for ivs in intervals for iv in ivs], dtype=np.int_).reshape(-1, 2)
+        self.starts: NDArrayInt = flat[:, 0].copy()
+        self.ends: NDArrayInt = flat[:, 1].copy()
+        self._build_lookups()
+
+    def _build_lookups(self) -> None:
+        self.node_to_idx: dict[Any, int] = {node: i for i, node in enumerate(self.nodes)}
+        # Intervals are sorted within each component, so composite keys
+        # (component, start) are sorted globally and one searchsorted call
+        # serves a whole batch of queries
+        n_components = len(self.interval_ptr) - 1
+        component_of_interval = np.repeat(np.arange(n_components), np.diff(self.interval_ptr))
+        self._keys = component_of_interval * n_components + self.starts
+
+    @property
+    def n_intervals(self) -> int:
+        return len(self.starts)
+
+    def reachable(self, u: Any, v: Any) -> bool:
+        sources = np.array([self.node_to_idx[u]])
+        targets = np.array([self.node_to_idx[v]])
+        return bool(self.reachable_batch(sources, targets)[0])
+
+    def reachable_batch(self, sources: NDArrayInt, targets: NDArrayInt) -> np.ndarray:
+        """
+        Vectorized queries for arrays of node indices (positions in self.nodes)
+        """
+        n_components = len(self.interval_ptr) - 1
+        c_u, c_v = self.labels[sources], self.labels[targets]
+        p = self.post[c_v]
+        i = np.searchsorted(self._keys, c_u * n_components + p, side="right") - 1
+        i_safe = np.maximum(i, 0)
+        covered = (i >= self.interval_ptr[c_u]) & (self.ends[i_safe] >= p)
+        return (c_u == c_v) | ((c_u < c_v) & covered)
+
+    def save(self, filename: Path) -> None:
+        nodes = np.asarray(self.nodes)
+        if nodes.dtype == object:
+            raise ValueError("Node labels must be all ints, all floats or all strings")
+        np.savez(
+            filename,
+            nodes=nodes,
+            labels=self.labels,
+            post=self.post,
+            interval_ptr=self.interval_ptr,
+            starts=self.starts,
+            ends=self.ends,
+        )
+
+    @classmethod
+    def load(cls, filename: Path) -> "ReachabilityIndex":
+        index = cls.__new__(cls)
+        with np.load(filename, allow_pickle=False) as data:
+            index.nodes = data["nodes"].tolist()
+            for name in ("labels", "post", "interval_ptr", "starts", "ends"):
+                setattr(index, name, data[name])
+        index._build_lookups()
+        return index
+
+
+if __name__ == "__main__":
+    # Dependency-like graph: a random DAG with a few cycles added
+    G = nx.gnp_random_graph(5000, 0.002, seed=42, directed=True)
+    G = nx.DiGraph([(u, v) for u, v in G.edges if u < v])
+    G.add_edges_from([(300, 100), (2000, 1500), (4000, 10)])
+
+    t_start = perf_counter()
+    index = ReachabilityIndex(G)
+    print(
+        f"Index built in {perf_counter() - t_start:.2f} s: "
+        f"{index.labels.max() + 1} components, {index.n_intervals} intervals"
+    )
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index.save(Path(tmp_dir) / "reachability_index.npz")
+        index = ReachabilityIndex.load(Path(tmp_dir) / "reachability_index.npz")
+
+    rng = np.random.default_rng(seed=42)
+    n_queries = 1_000_000
+    sources = rng.integers(len(index.nodes), size=n_queries)
+    targets = rng.integers(len(index.nodes), size=n_queries)
+    t_start = perf_counter()
+    res = index.reachable_batch(sources, targets)
+    t_index = perf_counter() - t_start
+    print(f"{n_queries} queries in {t_index:.2f} s, {res.mean():.1%} reachable")
+
+    n_checks = 200
+    t_start = perf_counter()
+    res_nx = [
+        nx.has_path(G, index.nodes[u], index.nodes[v])
+        for u, v in zip(sources[:n_checks], targets[:n_checks])
+    ]
+    t_nx = perf_counter() - t_start
+    print(
+        f"networkx: {n_checks} queries in {t_nx:.2f} s, "
+        f"answers match: {np.array_equal(res[:n_checks], res_nx)}"
+    )
@@ -0,0 +1,194 @@
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Optional
+
+import numpy as np
+import networkx as nx
+
+from src.common import AnyNxGraph, NDArrayInt, NDArrayFloat
+from src.csr import CsrGraph, gather_neighbors, to_csr
+
+
+def split_by_weight(csr: CsrGraph, delta: float) -> tuple[CsrGraph, CsrGraph]:
+    """
+    Splits the edges into light (weight <= delta) and heavy (weight > delta)
+    keeping the CSR layout
+    """
+    parts = []
+    row = np.repeat(np.arange(len(csr.indptr) - 1), np.diff(csr.indptr))
+    for mask in (csr.weights <= delta, csr.weights > delta):
+        indptr = np.zeros_like(csr.indptr)
+        np.cumsum(np.bincount(row[mask], minlength=len(indptr) - 1), out=indptr[1:])
+        parts.append(
+            CsrGraph(indptr=indptr, indices=csr.indices[mask], weights=csr.weights[mask], nodes=csr.nodes)
+        )
+    return parts[0], parts[1]
+
+
+def default_delta(csr: CsrGraph) -> float:
+    """
+    Bucket width Delta = max weight / mean degree (Meyer and Sanders, 2003).
+    Larger Delta gives fewer buckets, i.e. more work per vectorized step,
+    but more nodes are relaxed prematurely and have to be relaxed again
+    """
+    n_nodes = len(csr.indptr) - 1
+    if len(csr.weights) == 0:
+        return 1.0
+    mean_degree = len(csr.weights) / n_nodes
+    delta = float(csr.weights.max()) / max(mean_degree, 1.0)
+    positive = csr.weights[csr.weights > 0]
+    min_positive = float(positive.min()) if len(positive) > 0 else 1.0
+    return max(delta, min_positive)
+
+
+def _relax(
+    csr: CsrGraph, frontier: NDArrayInt, dist: NDArrayFloat, pred: NDArrayInt
+) -> NDArrayInt:
+    """
+    Relaxes all the edges going out of the frontier at once. The new distances
+    are scattered via np.minimum.at, which resolves the conflicts of several
+    edges pointing to the same node. Returns the nodes whose distance decreased
+    """
+    src, dst, edge_ids = gather_neighbors(csr, frontier)
+    candidates = dist[src] + csr.weights[edge_ids]
+    improved = candidates < dist[dst]
+    src, dst, candidates = src[improved], dst[improved], candidates[improved]
+    np.minimum.at(dist, dst, candidates)
+    # Any of the edges achieving the minimum is a valid predecessor
+    won = candidates == dist[dst]
+    pred[dst[won]] = src[won]
+    return np.unique(dst)
+
+
+def delta_stepping(
+    csr: CsrGraph,
+    source: int,
+    delta: Optional[float] = None,
+    parts: Optional[tuple[CsrGraph, CsrGraph]] = None,
+) -> tuple[NDArrayFloat, NDArrayInt]:
+    """
+    Delta-stepping single-source shortest paths for non-negative weights.
+    Nodes are kept in buckets of width delta by their tentative distance.
+    The smallest non-empty bucket is emptied repeatedly by relaxing the light
+    edges of all its nodes at once (light edges may put nodes back into
+    the same bucket), then the heavy edges of all the removed nodes are relaxed
+    once since they can only lead to later buckets. Dijkstra's algorithm is
+    the special case of infinitely narrow buckets.
+
+    When running from many sources, the light and heavy edges can be split
+    once by split_by_weight(csr, delta) and passed as parts (delta must then
+    be given too). Returns arrays dist and pred (-1 for the source and unreachable nodes)
+    indexed by node indices
+    """
+    if parts is None:
+        if np.any(csr.weights < 0):
+            raise ValueError("Delta-stepping requires non-negative edge weights")
+        delta = default_delta(csr) if delta is None else delta
+        parts = split_by_weight(csr, delta)
+    elif delta is None:
+        raise ValueError("delta must be given together with parts")
+    light, heavy = parts
+    n = len(csr.indptr) - 1
+    dist = np.full((n,), np.inf)
+    pred = np.full((n,), -1, dtype=np.int_)
+    dist[source] = 0.0
+    # Nodes waiting in the buckets are kept in an array instead of scanning
+    # all the nodes for each bucket. Bucket i holds the pending nodes with
+    # i * delta <= dist < (i + 1) * delta. A node whose distance decreases
+    # while pending is not moved, its bucket is found from dist when
+    # the buckets are emptied. Entries of the nodes which have left
+    # the buckets (is_pending is False) are dropped lazily
+    is_pending = np.zeros((n,), dtype=bool)
+    is_pending[source] = True
+    pending = np.array([source], dtype=np.int_)
+
+    def push(nodes: NDArrayInt) -> list[NDArrayInt]:
+        new = nodes[~is_pending[nodes]]
+        is_pending[new] = True
+        return [new]
+
+    while True:
+        pending = pending[is_pending[pending]]
+        if len(pending) == 0:
+            break
+        pending_dist = dist[pending]
+        bucket_end = (np.floor(pending_dist.min() / delta) + 1.0) * delta
+        in_bucket = pending_dist < bucket_end
+        frontier = np.unique(pending[in_bucket])
+        pushed = [pending[~in_bucket]]
+        removed = []
+        while len(frontier) > 0:
+            is_pending[frontier] = False
+            removed.append(frontier)
+            changed = _relax(light, frontier, dist, pred)
+            in_bucket = dist[changed] < bucket_end
+            frontier = changed[in_bucket]
+            pushed += push(changed[~in_bucket])
+        changed = _relax(heavy, np.unique(np.concatenate(removed)), dist, pred)
+        pushed += push(changed)
+        pending = np.concatenate(pushed)
+    return dist, pred
+
+
+class DeltaSteppingAlgorithm:
+    """
+    Single-source shortest paths via delta-stepping with the same outputs
+    as DpAlgorithmForShortestPath: dist[node] and shortest_paths[node],
+    the set of edges of the shortest path from the initial node
+    """
+    def __init__(self, G: AnyNxGraph, delta: Optional[float] = None) -> None:
+        self.G: AnyNxGraph = G
+        self.csr = to_csr(G, weight="weight")
+        self.delta = default_delta(self.csr) if delta is None else delta
+        if np.any(self.csr.weights < 0):
+            raise ValueError("Delta-stepping requires non-negative edge weights")
+        self.parts = split_by_weight(self.csr, self.delta)
+        self.dist: dict[Any, float] = {}
+        self.shortest_paths: dict[Any, set[tuple[Any, Any]]] = {}
+
+    def run(self, node: Any) -> None:
+        nodes = self.csr.nodes
+        dist, pred = delta_stepping(self.csr, nodes.index(node), self.delta, self.parts)
+        self.dist = {nodes[i]: float(dist[i]) for i in np.flatnonzero(np.isfinite(dist))}
+
+        # Paths are built from the predecessors, each path extends the path
+        # of its predecessor by one edge
+        paths: dict[int, set[tuple[Any, Any]]] = {nodes.index(node): set()}
+        for i in np.flatnonzero(np.isfinite(dist)).tolist():
+            chain = []
+            while i not in paths:
+                chain.append(i)
+                i = int(pred[i])
+            for j in reversed(chain):
+                paths[j] = paths[int(pred[j])] | {(nodes[int(pred[j])], nodes[j])}
+        self.shortest_paths = {nodes[i]: path for i, path in paths.items()}
+
+
+if __name__ == "__main__":
+    G = nx.read_edgelist(
+        Path("practicum_6") / "simple_weighted_graph_9_nodes.edgelist",
+        create_using=nx.DiGraph
+    )
+    ds = DeltaSteppingAlgorithm(G)
+    ds.run(node="0")
+    print(f"Distances: {ds.dist}")
+    print(f"Shortest path to 5: {sorted(ds.shortest_paths['5'])}")
+
+    # Large sparse graph with random weights
+    n = 200_000
+    rng = np.random.default_rng(seed=42)
+    G = nx.gnm_random_graph(n, 5 * n, seed=42, directed=True)
+    for u, v in G.edges:
+        G.edges[u, v]["weight"] = rng.uniform(0.0, 1.0)
+    csr = to_csr(G, weight="weight")
+    for delta in (None, 0.01, 1.0):
+        t_start = perf_counter()
+        dist, pred = delta_stepping(csr, source=0, delta=delta)
+        label = f"{default_delta(csr):.3f} (default)" if delta is None else f"{delta}"
+        print(f"Delta-stepping with Delta = {label}: {perf_counter() - t_start:.2f} s")
+    t_start = perf_counter()
+    dist_nx = nx.single_source_dijkstra_path_length(G, 0)
+    print(f"networkx Dijkstra: {perf_counter() - t_start:.2f} s")
+    dist_nx = np.array([dist_nx.get(node, np.inf) for node in csr.nodes])
+    reachable = np.isfinite(dist_nx)
+    print(f"Max abs difference: {np.max(np.abs(dist[reachable] - dist_nx[reachable])):.2e}")
@@ -9,6 +9,7 @@ import numpy as np
 from practicum_4.dfs_solved import TopologicalSorting
 from src.plotting.graphs import plot_graph
 from src.common import AnyNxGraph
+from src.shortest_path_cache import ShortestPathCache, path_from_tree, tree_from_paths
 
 
 class DpAlgorithmForShortestPath:
@@ -94,3 +95,21 @@ if __name__ == "__main__":
     plot_graph(G, highlighted_edges=list(dp.shortest_paths["5"][2]))
     plot_graph(G, highlighted_edges=list(dp.shortest_paths["5"][3]))
 
+    # Repeated queries from the same source are served from the cache until
+    # the graph changes
+    cache = ShortestPathCache()
+    nodes = list(G.nodes)
+
+    def compute_tree(source: Any):
+        dp = DpAlgorithmForShortestPath(G)
+        dp.run(node=source)
+        return tree_from_paths(nodes, source, dp.dist, dp.shortest_paths)
+
+    for _ in range(3):
+        version = cache.graph_version("practicum_6")
+        tree = cache.get_or_compute(version, "dp", "0", lambda: compute_tree("0"))
+    G.edges["0", "1"]["weight"] += 1
+    version = cache.bump_version("practicum_6")  # the graph has been modified
+    tree = cache.get_or_compute(version, "dp", "0", lambda: compute_tree("0"))
+    path = [nodes[i] for i in path_from_tree(tree, nodes.index("5"))]
+    print(f"Cache hits: {cache.n_hits}, misses: {cache.n_misses}, path to 5: {path}")
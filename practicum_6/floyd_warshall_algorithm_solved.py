@@ -9,6 +9,7 @@ import numpy as np
 from practicum_4.dfs_solved import TopologicalSorting
 from src.plotting.graphs import plot_graph
 from src.common import AnyNxGraph
+from src.shortest_path_cache import ShortestPathCache, path_from_tree, tree_from_paths
 
 
 class FloydWarshallAlgorithm:
@@ -53,3 +54,16 @@ if __name__ == "__main__":
     fw.run(node="0")
     plot_graph(G, highlighted_edges=list(fw.shortest_paths[("0", "5")]))
 
+    # All the shortest path trees are cached after a single run, so queries
+    # from any source are hits until the graph changes
+    cache = ShortestPathCache()
+    nodes = list(G.nodes)
+    version = cache.graph_version("practicum_6_fw")
+    for source in nodes:
+        dist = {n: fw.dist[(source, n)] for n in nodes} | {source: 0}
+        paths = {n: fw.shortest_paths[(source, n)] for n in nodes}
+        cache.put((version, "floyd_warshall", source, None), tree_from_paths(nodes, source, dist, paths))
+    tree = cache.get((version, "floyd_warshall", "0", None))
+    path = [nodes[i] for i in path_from_tree(tree, nodes.index("5"))]
+    print(f"Cache hits: {cache.n_hits}, misses: {cache.n_misses}, path from 0 to 5: {path}")
+
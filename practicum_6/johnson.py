@@ -0,0 +1,173 @@
+from concurrent.futures import ProcessPoolExecutor
+import os
+from pathlib import Path
+import tempfile
+from time import perf_counter
+from typing import Optional
+
+import numpy as np
+import networkx as nx
+
+from practicum_6.delta_stepping import default_delta, delta_stepping, split_by_weight
+from src.common import AnyNxGraph, NDArrayInt, NDArrayFloat
+from src.csr import CsrGraph, to_csr
+
+
+def bellman_ford_potentials(csr: CsrGraph) -> tuple[NDArrayFloat, Optional[list[int]]]:
+    """
+    Bellman-Ford from a virtual source connected to all the nodes by zero-weight
+    edges. Each round relaxes all the edges at once via np.minimum.at and
+    the iteration stops as soon as a round changes nothing. If distances still
+    change after n rounds, there is a negative cycle, which is then returned
+    as a list of node indices (None otherwise)
+    """
+    n = len(csr.indptr) - 1
+    src = np.repeat(np.arange(n), np.diff(csr.indptr))
+    dst, w = csr.indices, csr.weights
+    h = np.zeros((n,), dtype=np.float64)
+    pred = np.full((n,), -1, dtype=np.int_)
+    for _ in range(n):
+        candidates = h[src] + w
+        improved = candidates < h[dst]
+        if not np.any(improved):
+            return h, None
+        np.minimum.at(h, dst[improved], candidates[improved])
+        won = improved & (candidates == h[dst])
+        pred[dst[won]] = src[won]
+
+    # Following the predecessors n times from a node updated in the last round
+    # ends up on the negative cycle
+    node = int(dst[improved][0])
+    for _ in range(n):
+        node = int(pred[node])
+    cycle = [node]
+    while (node := int(pred[node])) != cycle[0]:
+        cycle.append(node)
+    return h, cycle[::-1]
+
+
+_worker_csr: Optional[CsrGraph] = None
+_worker_potentials: Optional[NDArrayFloat] = None
+_worker_delta: Optional[float] = None
+_worker_parts: Optional[tuple[CsrGraph, CsrGraph]] = None
+
+
+def _init_worker(csr: CsrGraph, h: NDArrayFloat, delta: float) -> None:
+    # The graph is sent to each worker process once rather than with each task
+    # and its edges are split into light and heavy once for all the sources
+    global _worker_csr, _worker_potentials, _worker_delta, _worker_parts
+    _worker_csr = csr
+    _worker_potentials = h
+    _worker_delta = delta
+    _worker_parts = split_by_weight(csr, delta)
+
+
+def _write_rows(
+    sources: NDArrayInt,
+    filename: Path,
+    csr: Optional[CsrGraph] = None,
+    h: Optional[NDArrayFloat] = None,
+    delta: Optional[float] = None,
+) -> None:
+    if csr is None:
+        csr, h, delta, parts = _worker_csr, _worker_potentials, _worker_delta, _worker_parts
+    else:
+        parts = split_by_weight(csr, delta)
+    n = len(csr.indptr) - 1
+    dist = np.memmap(filename, dtype=np.float64, mode="r+", shape=(n, n))
+    for s in sources.tolist():
+        dist_reweighted, _ = delta_stepping(csr, s, delta, parts)
+        # Undo the reweighting: d(s, v) = d'(s, v) - h(s) + h(v)
+        dist[s] = dist_reweighted - h[s] + h
+    dist.flush()
+
+
+def johnson(
+    G: AnyNxGraph, filename: Optional[Path] = None, n_workers: int = 1
+) -> np.memmap:
+    """
+    All-pairs shortest paths for sparse graphs with possibly negative weights.
+    Bellman-Ford potentials h make all the weights w(u, v) + h(u) - h(v)
+    non-negative without changing the shortest paths, so that single-source
+    shortest paths can then be found from each node by delta-stepping
+    (instead of Dijkstra's algorithm). Sources are split between n_workers
+    processes which write the rows of the distance matrix straight into
+    a memory-mapped file, so the n x n matrix is never held in memory.
+
+    Returns the read-only memory-mapped matrix whose rows and columns follow
+    the order of G.nodes. If filename is None, the matrix is written
+    to a new temporary file which is not deleted automatically: the caller
+    should remove it (its path is the filename attribute of the returned
+    matrix) once the matrix is no longer needed. Raises nx.NetworkXUnbounded
+    if there is a negative cycle
+    """
+    csr = to_csr(G, weight="weight")
+    n = len(csr.nodes)
+    h, cycle = bellman_ford_potentials(csr)
+    if cycle is not None:
+        raise nx.NetworkXUnbounded(
+            f"Negative cycle detected: {[csr.nodes[i] for i in cycle]}"
+        )
+    # Reweighted edges are non-negative up to rounding errors
+    src = np.repeat(np.arange(n), np.diff(csr.indptr))
+    weights = np.maximum(csr.weights + h[src] - h[csr.indices], 0.0)
+    csr = csr._replace(weights=weights)
+    delta = default_delta(csr)
+
+    if filename is None:
+        fd, name = tempfile.mkstemp(suffix=".dist")
+        os.close(fd)
+        filename = Path(name)
+    dist = np.memmap(filename, dtype=np.float64, mode="w+", shape=(n, n))
+    del dist  # rows are written by _write_rows
+
+    sources = np.arange(n)
+    if n_workers == 1:
+        _write_rows(sources, filename, csr, h, delta)
+    else:
+        with ProcessPoolExecutor(
+            max_workers=n_workers, initializer=_init_worker, initargs=(csr, h, delta)
+        ) as executor:
+            # Many small chunks balance the load between the workers
+            chunks = np.array_split(sources, 8 * n_workers)
+            list(executor.map(_write_rows, chunks, [filename] * len(chunks)))
+    return np.memmap(filename, dtype=np.float64, mode="r", shape=(n, n))
+
+
+if __name__ == "__main__":
+    G = nx.read_edgelist(
+        Path("practicum_6") / "simple_weighted_graph_9_nodes.edgelist",
+        create_using=nx.DiGraph
+    )
+    G.edges["0", "1"]["weight"] = -3  # negative weight, but no negative cycles
+    dist = johnson(G)
+    nodes = list(G.nodes)
+    print(f"Distance from 0 to 5: {dist[nodes.index('0'), nodes.index('5')]}")
+    print(f"networkx: {nx.bellman_ford_path_length(G, '0', '5')}")
+    filename = dist.filename
+    del dist
+    os.remove(filename)
+
+    G.add_edge("1", "0", weight=2)
+    try:
+        johnson(G)
+    except nx.NetworkXUnbounded as e:
+        print(e)
+
+    # Sparse graph with negative weights obtained from potentials,
+    # so that there are no negative cycles
+    n = 2000
+    rng = np.random.default_rng(seed=42)
+    G = nx.gnm_random_graph(n, 5 * n, seed=42, directed=True)
+    potentials = rng.uniform(0.0, 10.0, size=n)
+    for u, v in G.edges:
+        G.edges[u, v]["weight"] = rng.uniform(0.0, 1.0) + potentials[v] - potentials[u]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        t_start = perf_counter()
+        dist = johnson(G, filename=Path(tmp_dir) / "dist.bin", n_workers=4)
+        print(f"Johnson: {perf_counter() - t_start:.2f} s")
+        dist_nx = nx.single_source_bellman_ford_path_length(G, 0)
+        row = np.array([dist_nx.get(v, np.inf) for v in G.nodes])
+        reachable = np.isfinite(row)
+        print(f"Max abs difference in row 0: {np.max(np.abs(dist[0][reachable] - row[reachable])):.2e}")
+        del dist
@@ -0,0 +1,160 @@
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+import networkx as nx
+
+from src.common import AnyNxGraph, NDArrayFloat
+
+
+def min_plus_matmul(A: NDArrayFloat, B: NDArrayFloat, block_size: int = 64) -> NDArrayFloat:
+    """
+    Matrix product in the tropical (min, +) semiring: C_ij = min_k (A_ik + B_kj).
+    The product is computed tile by tile, so that the temporary array of sums
+    A_ik + B_kj has at most block_size^3 entries
+    """
+    n, m = A.shape
+    m_b, p = B.shape
+    if m != m_b:
+        raise ValueError(f"Incompatible shapes: {A.shape} and {B.shape}")
+    C = np.full((n, p), np.inf, dtype=np.result_type(A, B, np.float64))
+    for i in range(0, n, block_size):
+        i_end = min(i + block_size, n)
+        for j in range(0, p, block_size):
+            j_end = min(j + block_size, p)
+            C_tile = C[i:i_end, j:j_end]
+            for k in range(0, m, block_size):
+                k_end = min(k + block_size, m)
+                sums = A[i:i_end, k:k_end, None] + B[None, k:k_end, j:j_end]
+                np.minimum(C_tile, sums.min(axis=1), out=C_tile)
+    return C
+
+
+def min_plus_identity(n: int) -> NDArrayFloat:
+    I = np.full((n, n), np.inf)
+    np.fill_diagonal(I, 0.0)
+    return I
+
+
+def weight_matrix(G: AnyNxGraph) -> NDArrayFloat:
+    """
+    W_ij is the weight of edge (i, j), inf if there is no edge and 0 on
+    the diagonal (staying at a node costs nothing). Then (W^k)_ij in the (min, +)
+    semiring is the length of the shortest path from i to j with at most k edges
+    """
+    W = nx.to_numpy_array(G, weight="weight", nonedge=np.inf)
+    np.fill_diagonal(W, np.minimum(np.diag(W), 0.0))
+    return W
+
+
+def _check_negative_cycles(D: NDArrayFloat) -> None:
+    if np.any(np.diag(D) < 0):
+        raise nx.NetworkXUnbounded(
+            f"Negative cycle through node index {int(np.argmax(np.diag(D) < 0))}"
+        )
+
+
+def apsp_repeated_squaring(W: NDArrayFloat, block_size: int = 64) -> NDArrayFloat:
+    """
+    All-pairs shortest paths computed by repeated squaring: W^2, W^4, ...
+    until the number of edges reaches n or the matrix stops changing.
+    Shortest paths have at most n - 1 edges, but a negative cycle may need n
+    edges to show up on the diagonal (e.g., a cycle through all the nodes
+    when n - 1 is a power of two). Takes O(n^3 log n) operations, i.e. more than
+    Floyd-Warshall, but each step is a single vectorized product
+    """
+    n = W.shape[0]
+    D = W.copy()
+    n_edges = 1
+    while n_edges < n:
+        D_next = min_plus_matmul(D, D, block_size)
+        n_edges *= 2
+        if np.array_equal(D_next, D):
+            break
+        D = D_next
+    _check_negative_cycles(D)
+    return D
+
+
+def k_hop_distances(W: NDArrayFloat, k: int, block_size: int = 64) -> NDArrayFloat:
+    """
+    Shortest paths using at most k edges as W^k computed by exponentiation
+    by squaring, i.e. O(log k) products instead of k DP sweeps
+    """
+    result = min_plus_identity(W.shape[0])
+    base = W
+    while k > 0:
+        if k & 1:
+            result = min_plus_matmul(result, base, block_size)
+        k >>= 1
+        if k > 0:
+            base = min_plus_matmul(base, base, block_size)
+    return result
+
+
+def k_hop_distances_via_dp(W: NDArrayFloat, k: int) -> NDArrayFloat:
+    """
+    Reference implementation: k DP sweeps D <- D (min, +) W, which is what
+    DpAlgorithmForShortestReliablePath does for a single source
+    """
+    D = min_plus_identity(W.shape[0])
+    for _ in range(k):
+        D = min_plus_matmul(D, W)
+    return D
+
+
+if __name__ == "__main__":
+    G = nx.read_edgelist(
+        Path("practicum_6") / "simple_weighted_graph_9_nodes.edgelist",
+        create_using=nx.DiGraph
+    )
+    nodes = list(G.nodes)
+    W = weight_matrix(G)
+    D = apsp_repeated_squaring(W)
+    i, j = nodes.index("0"), nodes.index("5")
+    print(f"Distance from 0 to 5: {D[i, j]}")
+    for k in (2, 3):
+        print(f"Distance from 0 to 5 with at most {k} edges: {k_hop_distances(W, k)[i, j]}")
+
+    # Negative cycles through all the nodes must be detected for any n
+    for n in (3, 5, 6, 9):
+        C = nx.DiGraph()
+        nx.add_cycle(C, range(n), weight=1.0)
+        C.edges[n - 1, 0]["weight"] = -float(n)
+        try:
+            apsp_repeated_squaring(weight_matrix(C))
+            print(f"Negative cycle through {n} nodes: not detected")
+        except nx.NetworkXUnbounded:
+            print(f"Negative cycle through {n} nodes: detected")
+
+    # Larger random graph
+    n = 400
+    rng = np.random.default_rng(seed=42)
+    G = nx.gnp_random_graph(n, 0.02, seed=42, directed=True)
+    for u, v in G.edges:
+        G.edges[u, v]["weight"] = rng.uniform(1.0, 10.0)
+    W = weight_matrix(G)
+
+    t_start = perf_counter()
+    D = apsp_repeated_squaring(W)
+    t_squaring = perf_counter() - t_start
+    t_start = perf_counter()
+    D_fw = nx.floyd_warshall_numpy(G)
+    t_fw = perf_counter() - t_start
+    print(
+        f"APSP via repeated squaring: {t_squaring:.2f} s, "
+        f"networkx Floyd-Warshall: {t_fw:.2f} s, "
+        f"max abs difference: {np.max(np.abs(D[np.isfinite(D)] - D_fw[np.isfinite(D)])):.2e}"
+    )
+
+    k = 20
+    t_start = perf_counter()
+    D_k = k_hop_distances(W, k)
+    t_squaring = perf_counter() - t_start
+    t_start = perf_counter()
+    D_k_dp = k_hop_distances_via_dp(W, k)
+    t_dp = perf_counter() - t_start
+    print(
+        f"{k}-hop distances via squaring: {t_squaring:.2f} s, via {k} DP sweeps: {t_dp:.2f} s, "
+        f"close: {np.allclose(D_k, D_k_dp)}"
+    )
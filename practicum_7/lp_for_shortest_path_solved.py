@@ -8,6 +8,7 @@ from scipy.optimize import linprog
 
 from src.plotting.graphs import plot_graph
 from src.common import AnyNxGraph, NDArrayInt, NDArrayFloat
+from src.shortest_path_cache import ShortestPathCache, ShortestPathTree, path_from_tree, tree_from_paths
 
 
 class ShortestPathLinearProgram:
@@ -85,3 +86,28 @@ if __name__ == "__main__":
     lp = ShortestPathLinearProgram(G)
     shortest_path_edges = lp.solve(s_node=s_node, t_node=t_node)
     plot_graph(G, highlighted_edges=shortest_path_edges)
+
+    # Solving the LP is expensive, so repeated queries for the same pair
+    # of nodes are served from the cache until the graph changes
+    cache = ShortestPathCache()
+
+    def compute_tree() -> ShortestPathTree:
+        lp = ShortestPathLinearProgram(G)
+        edges = lp.solve(s_node=s_node, t_node=t_node)
+        successors = dict(edges)
+        dist = {s_node: 0}
+        node = s_node
+        while node != t_node:
+            dist[successors[node]] = dist[node] + G.edges[node, successors[node]]["weight"]
+            node = successors[node]
+        return tree_from_paths(lp.nodes, s_node, dist, {v: {(u, v)} for u, v in edges})
+
+    for _ in range(3):
+        version = cache.graph_version("practicum_7")
+        tree = cache.get_or_compute(version, "lp", s_node, compute_tree, target=t_node)
+    G.edges["0", "1"]["weight"] += 10
+    version = cache.bump_version("practicum_7")  # the graph has been modified
+    tree = cache.get_or_compute(version, "lp", s_node, compute_tree, target=t_node)
+    nodes = list(G.nodes)
+    path = [nodes[i] for i in path_from_tree(tree, nodes.index(t_node))]
+    print(f"Cache hits: {cache.n_hits}, misses: {cache.n_misses}, path from 0 to 5: {path}")
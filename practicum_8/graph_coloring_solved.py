@@ -1,4 +1,4 @@
-from typing import Protocol
+from typing import Optional, Protocol
 
 import numpy as np
 import networkx as nx
@@ -29,6 +29,150 @@ def set_colors(G: nx.Graph, colors: NDArrayInt) -> None:
         G.nodes[n]["color"] = color
 
 
+def _adjacency_as_indices(G: nx.Graph) -> list[list[int]]:
+    """
+    Colors are stored in the order of G.nodes, so we relabel nodes
+    by their positions to index arrays directly
+    """
+    node_to_idx = {n: i for i, n in enumerate(G.nodes)}
+    return [[node_to_idx[m] for m in G.neighbors(n)] for n in G.nodes]
+
+
+def _pick_color(neigh_colors: NDArrayInt, n_max_colors: Optional[int]) -> int:
+    """
+    Returns the smallest color absent among the neighbors. If all the allowed
+    colors are taken, returns the color with the fewest conflicts
+    """
+    if n_max_colors is None:
+        n_max_colors = len(neigh_colors) + 1
+    counts = np.bincount(
+        neigh_colors[neigh_colors < n_max_colors], minlength=n_max_colors
+    )
+    return int(np.argmin(counts))  # argmin returns the first zero if any
+
+
+def _color_in_order(
+    adj: list[list[int]], order: list[int], n_max_colors: Optional[int]
+) -> NDArrayInt:
+    colors = np.full((len(adj),), -1, dtype=np.int_)
+    for v in order:
+        neigh_colors = colors[adj[v]]
+        colors[v] = _pick_color(neigh_colors[neigh_colors >= 0], n_max_colors)
+    return colors
+
+
+def largest_first_coloring(
+    G: nx.Graph, n_max_colors: Optional[int] = None
+) -> NDArrayInt:
+    """
+    Greedy coloring where nodes are visited in order of decreasing degree
+    """
+    adj = _adjacency_as_indices(G)
+    order = sorted(range(len(adj)), key=lambda v: len(adj[v]), reverse=True)
+    return _color_in_order(adj, order, n_max_colors)
+
+
+def smallest_last_coloring(
+    G: nx.Graph, n_max_colors: Optional[int] = None
+) -> NDArrayInt:
+    """
+    Greedy coloring where nodes are visited in the reversed order of
+    their removal: at each step, we remove the node with the smallest degree
+    in the remaining graph. Nodes are kept in buckets indexed by their current
+    degree so that the whole ordering takes O(|V| + |E|)
+    """
+    adj = _adjacency_as_indices(G)
+    n_nodes = len(adj)
+    degrees = [len(neighs) for neighs in adj]
+    buckets: list[set[int]] = [set() for _ in range(max(degrees, default=0) + 1)]
+    for v, d in enumerate(degrees):
+        buckets[d].add(v)
+
+    removed = np.zeros((n_nodes,), dtype=bool)
+    order = []
+    min_degree = 0
+    for _ in range(n_nodes):
+        # Removing a node decreases the degrees of its neighbors by one,
+        # so the smallest non-empty bucket is at least min_degree - 1
+        min_degree = max(min_degree - 1, 0)
+        while not buckets[min_degree]:
+            min_degree += 1
+        v = buckets[min_degree].pop()
+        removed[v] = True
+        order.append(v)
+        for u in adj[v]:
+            if not removed[u]:
+                buckets[degrees[u]].remove(u)
+                degrees[u] -= 1
+                buckets[degrees[u]].add(u)
+    order.reverse()
+    return _color_in_order(adj, order, n_max_colors)
+
+
+def dsatur_coloring(G: nx.Graph, n_max_colors: Optional[int] = None) -> NDArrayInt:
+    """
+    DSATUR: at each step, color the uncolored node with the largest saturation
+    (number of distinct colors among its neighbors), breaking ties by degree.
+    Uncolored nodes are kept in buckets indexed by (saturation, degree) so that
+    each step costs O(deg) amortized instead of scanning all the nodes.
+    If n_max_colors is given and a node cannot be colored without conflicts,
+    it gets the least conflicting color
+    """
+    adj = _adjacency_as_indices(G)
+    n_nodes = len(adj)
+    if n_nodes == 0:
+        return np.zeros((0,), dtype=np.int_)
+    degrees = [len(neighs) for neighs in adj]
+    max_degree = max(degrees)
+    # Saturation never exceeds the degree nor the number of available colors
+    max_saturation = max_degree if n_max_colors is None else min(max_degree, n_max_colors)
+
+    # buckets[s][d] contains uncolored nodes with saturation s and degree d
+    buckets: list[list[set[int]]] = [
+        [set() for _ in range(max_degree + 1)] for _ in range(max_saturation + 1)
+    ]
+    # Largest non-empty degree bucket per saturation level, -1 if the level is empty
+    top_degree = [-1] * (max_saturation + 1)
+    for v, d in enumerate(degrees):
+        buckets[0][d].add(v)
+    top_degree[0] = max_degree
+    top_saturation = 0
+
+    colors = np.full((n_nodes,), -1, dtype=np.int_)
+    neigh_colors: list[set[int]] = [set() for _ in range(n_nodes)]
+    for _ in range(n_nodes):
+        while top_degree[top_saturation] == -1:
+            top_saturation -= 1
+        s = top_saturation
+        d = top_degree[s]
+        v = buckets[s][d].pop()
+        while d >= 0 and not buckets[s][d]:
+            d -= 1
+        top_degree[s] = d
+
+        neighs = np.array(adj[v], dtype=np.int_)
+        neigh_colors_v = colors[neighs]
+        colors[v] = c = _pick_color(neigh_colors_v[neigh_colors_v >= 0], n_max_colors)
+
+        # Increase the saturation of the uncolored neighbors which have not
+        # seen color c yet
+        for u in adj[v]:
+            if colors[u] != -1 or c in neigh_colors[u]:
+                continue
+            s_old = len(neigh_colors[u])
+            neigh_colors[u].add(c)
+            s_new = s_old + 1
+            d_u = degrees[u]
+            buckets[s_old][d_u].remove(u)
+            buckets[s_new][d_u].add(u)
+            top_degree[s_new] = max(top_degree[s_new], d_u)
+            top_saturation = max(top_saturation, s_new)
+            if d_u == top_degree[s_old] and not buckets[s_old][d_u]:
+                while top_degree[s_old] >= 0 and not buckets[s_old][top_degree[s_old]]:
+                    top_degree[s_old] -= 1
+    return colors
+
+
 def tweak(colors: NDArrayInt, n_max_colors: int) -> NDArrayInt:
     new_colors = colors.copy()
     n_nodes = len(new_colors)
@@ -96,18 +240,27 @@ def solve_with_restarts(
     solver: GraphColoringSolver,
     G: nx.Graph,
     n_max_colors: int,
-    initial_colors: NDArrayInt,
+    initial_colors: Optional[NDArrayInt],
     n_iters: int,
     n_restarts: int,
 ) -> NDArrayInt:
+    """
+    If initial_colors is None, each restart starts from a random coloring.
+    Otherwise, each restart starts from initial_colors (e.g., produced by
+    dsatur_coloring), and the restarts differ only by the randomness
+    of the solver
+    """
     loss_history = np.zeros((n_restarts, n_iters))
     for i in range(n_restarts):
         print(f"Restart #{i+1}")
-        initial_colors = np.random.randint(
-            low=0, high=n_max_colors - 1, size=len(G.nodes)
-        )
-        set_colors(G, initial_colors)
-        loss_history_per_run = solver(G, n_max_colors, initial_colors, n_max_iters)
+        if initial_colors is None:
+            restart_colors = np.random.randint(
+                low=0, high=n_max_colors - 1, size=len(G.nodes)
+            )
+        else:
+            restart_colors = initial_colors.copy()
+        set_colors(G, restart_colors)
+        loss_history_per_run = solver(G, n_max_colors, restart_colors, n_iters)
         loss_history[i, :] = loss_history_per_run
     return loss_history
 
@@ -133,7 +286,25 @@ if __name__ == "__main__":
         solve_via_hill_climbing,
         G,
         n_max_colors,
-        initial_colors,
+        None,
+        n_max_iters,
+        n_restarts,
+    )
+    plot_loss_history(loss_history)
+
+    # Constructive colorings give a much better starting point for local search
+    for coloring in (largest_first_coloring, smallest_last_coloring, dsatur_coloring):
+        initial_colors = coloring(G, n_max_colors)
+        print(
+            f"{coloring.__name__}: "
+            f"{number_of_conflicts(G, initial_colors)} initial conflicts"
+        )
+
+    loss_history = solve_with_restarts(
+        solve_via_hill_climbing,
+        G,
+        n_max_colors,
+        dsatur_coloring(G, n_max_colors),
         n_max_iters,
         n_restarts,
     )
@@ -1,32 +1,21 @@
-from abc import ABC, abstractmethod
-
 import numpy as np
 from numpy.typing import DTypeLike
 
-from practicum_7.lu import LinearSystemSolver
+from practicum_9.lu import LuSolver
 from src.common import NDArrayFloat
 
 
-class LuSolverWithPermute(LinearSystemSolver):
+class LuSolverWithPermute(LuSolver):
+    """
+    LU decomposition with partial pivoting. The permutation is stored
+    as a vector perm such that PA = LU is equivalent to A[perm] = LU
+    """
     def __init__(self, A: NDArrayFloat, dtype: DTypeLike, permute: bool) -> None:
-        super().__init__(A, dtype)
-        self.L, self.U, self.P = self._decompose(permute)
-
-    def solve(self, b: NDArrayFloat) -> NDArrayFloat:
-
-        ##########################
-        ### PUT YOUR CODE HERE ###
-        ##########################
-
-        pass
+        super().__init__(A, dtype, permute=permute)
 
-    def _decompose(self, permute: bool) -> tuple[NDArrayFloat, NDArrayFloat, NDArrayFloat]:
-
-        ##########################
-        ### PUT YOUR CODE HERE ###
-        ##########################
-
-        pass
+    @property
+    def P(self) -> NDArrayFloat:
+        return np.eye(self.LU.shape[0], dtype=self.dtype)[self.perm]
 
 
 def get_A_b(a_11: float, b_1: float) -> tuple[NDArrayFloat, NDArrayFloat]:
@@ -41,7 +30,6 @@ if __name__ == "__main__":
     b_1 = -16 + 10 ** (-p)  # add/remove 10**(-p) to check instability
     A, b = get_A_b(a_11, b_1)
 
-    solver = LuSolver(A, np.float64, permute=True)
+    solver = LuSolverWithPermute(A, np.float64, permute=True)
     x = solver.solve(b)
     assert np.all(np.isclose(x, [1, -7, 4])), f"The anwser {x} is not accurate enough"
-
@@ -1,9 +1,14 @@
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+import hashlib
+from time import perf_counter
 
 import numpy as np
 from numpy.typing import DTypeLike
+import scipy.linalg
 
-from src.common import NDArrayFloat
+from src.common import NDArrayInt, NDArrayFloat
+from src.linalg import get_scipy_solution
 
 
 class LinearSystemSolver(ABC):
@@ -12,30 +17,218 @@ class LinearSystemSolver(ABC):
         self.dtype = dtype
 
     @abstractmethod
-    def solve(b: NDArrayFloat) -> NDArrayFloat:
+    def solve(self, b: NDArrayFloat) -> NDArrayFloat:
         pass
 
 
+def lu_factor_inplace(
+    A: NDArrayFloat, permute: bool = True, block_size: int = 128
+) -> NDArrayInt:
+    """
+    Blocked right-looking LU decomposition PA = LU overwriting A.
+    After the call, the strictly lower triangle of A stores L (its unit diagonal
+    is implied) and the upper triangle stores U. The permutation is returned
+    as a vector perm such that A_original[perm] = LU.
+
+    Each block step consists of:
+    1. Panel factorization of A[k:, k:k+nb] column by column
+    2. Triangular solve (TRSM) for the block row U_12 = L_11^{-1} A_12
+    3. Matrix multiplication (GEMM) for the trailing update A_22 -= L_21 U_12
+    so that most of the flops are done by matmul
+    """
+    n = A.shape[0]
+    perm = np.arange(n)
+    for k in range(0, n, block_size):
+        k_end = min(k + block_size, n)
+
+        # Panel factorization. Row swaps are applied to the whole rows
+        # so that both the computed part of L and the trailing matrix stay consistent
+        for j in range(k, k_end):
+            if permute:
+                p = j + int(np.argmax(np.abs(A[j:, j])))
+                if p != j:
+                    A[[j, p], :] = A[[p, j], :]
+                    perm[[j, p]] = perm[[p, j]]
+            if A[j, j] == 0:
+                raise np.linalg.LinAlgError(f"Zero pivot at index {j}")
+            A[j + 1 :, j] /= A[j, j]
+            A[j + 1 :, j + 1 : k_end] -= np.outer(A[j + 1 :, j], A[j, j + 1 : k_end])
+
+        if k_end < n:
+            # TRSM with the unit lower triangular diagonal block
+            A[k:k_end, k_end:] = scipy.linalg.solve_triangular(
+                A[k:k_end, k:k_end],
+                A[k:k_end, k_end:],
+                lower=True,
+                unit_diagonal=True,
+                check_finite=False,
+            )
+            # GEMM
+            A[k_end:, k_end:] -= A[k_end:, k:k_end] @ A[k:k_end, k_end:]
+    return perm
+
+
+def lu_solve_factored(
+    LU: NDArrayFloat, perm: NDArrayInt, b: NDArrayFloat
+) -> NDArrayFloat:
+    """
+    Solves LUx = Pb via forward and back substitutions. b can be either
+    a vector of shape (n,) or a matrix of shape (n, k) whose columns are
+    k right-hand sides solved at once
+    """
+    y = scipy.linalg.solve_triangular(
+        LU, b[perm], lower=True, unit_diagonal=True, check_finite=False
+    )
+    return scipy.linalg.solve_triangular(LU, y, lower=False, check_finite=False)
+
+
+# Maps the content hash of a matrix to its LU factors so that constructing
+# solvers for the same matrix again does not repeat the decomposition
+_FACTORIZATION_CACHE: OrderedDict[str, tuple[NDArrayFloat, NDArrayInt]] = OrderedDict()
+FACTORIZATION_CACHE_MAX_SIZE = 8
+
+
+def _matrix_hash(A: NDArrayFloat, permute: bool) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{A.shape}{A.dtype.str}{permute}".encode())
+    h.update(np.ascontiguousarray(A).data)
+    return h.hexdigest()
+
+
+def clear_factorization_cache() -> None:
+    _FACTORIZATION_CACHE.clear()
+
+
 class LuSolver(LinearSystemSolver):
-    def __init__(self, A: NDArrayFloat, dtype: DTypeLike) -> None:
+    def __init__(
+        self,
+        A: NDArrayFloat,
+        dtype: DTypeLike,
+        permute: bool = False,
+        use_cache: bool = True,
+    ) -> None:
         super().__init__(A, dtype)
-        self.L, self.U = self._decompose()
+        self.permute = permute
+        if use_cache:
+            self.LU, self.perm = self._decompose_cached()
+        else:
+            self.LU, self.perm = self._decompose()
+
+    @property
+    def L(self) -> NDArrayFloat:
+        return np.tril(self.LU, k=-1) + np.eye(self.LU.shape[0], dtype=self.dtype)
+
+    @property
+    def U(self) -> NDArrayFloat:
+        return np.triu(self.LU)
 
     def solve(self, b: NDArrayFloat) -> NDArrayFloat:
+        """
+        b is either a vector of shape (n,) or a matrix of shape (n, k)
+        whose columns are treated as independent right-hand sides
+        """
+        x = lu_solve_factored(self.LU, self.perm, b.astype(self.dtype, copy=False))
+        return x.astype(self.dtype, copy=False)
 
-        ##########################
-        ### PUT YOUR CODE HERE ###
-        ##########################
+    def _decompose(self) -> tuple[NDArrayFloat, NDArrayInt]:
+        LU = self.A.copy()
+        perm = lu_factor_inplace(LU, permute=self.permute)
+        return LU, perm
 
-        pass
+    def _decompose_cached(self) -> tuple[NDArrayFloat, NDArrayInt]:
+        key = _matrix_hash(self.A, self.permute)
+        if key in _FACTORIZATION_CACHE:
+            _FACTORIZATION_CACHE.move_to_end(key)
+            return _FACTORIZATION_CACHE[key]
 
-    def _decompose(self) -> tuple[NDArrayFloat, NDArrayFloat]:
+        LU, perm = self._decompose()
+        # Factors are shared between solvers, so they must not be modified
+        LU.flags.writeable = False
+        perm.flags.writeable = False
+        _FACTORIZATION_CACHE[key] = (LU, perm)
+        if len(_FACTORIZATION_CACHE) > FACTORIZATION_CACHE_MAX_SIZE:
+            _FACTORIZATION_CACHE.popitem(last=False)
+        return LU, perm
 
-        ##########################
-        ### PUT YOUR CODE HERE ###
-        ##########################
 
-        pass
+class MixedPrecisionLuSolver(LinearSystemSolver):
+    """
+    Solves Ax = b via iterative refinement: A is factored in low precision
+    (float32 by default), while residuals r = b - Ax and the solution x are
+    kept in dtype (float64 by default). Each iteration solves Ad = r using
+    the low precision factors and updates x += d. Refinement stops once
+    the normwise backward error ||r|| / (||A|| ||x|| + ||b||) reaches the level
+    of the unit roundoff of dtype. If refinement stagnates, the system is solved
+    via the LU decomposition in dtype instead.
+    """
+    def __init__(
+        self,
+        A: NDArrayFloat,
+        dtype: DTypeLike = np.float64,
+        low_dtype: DTypeLike = np.float32,
+        max_iters: int = 30,
+        use_cache: bool = True,
+    ) -> None:
+        super().__init__(A, dtype)
+        self.low_dtype = low_dtype
+        self.max_iters = max_iters
+        self.use_cache = use_cache
+        self.low_precision_solver = LuSolver(
+            self.A, low_dtype, permute=True, use_cache=use_cache
+        )
+        # Only the factors are needed, the low precision copy of A is released
+        del self.low_precision_solver.A
+        self.fallback_solver: LuSolver | None = None
+        self.A_norm = np.linalg.norm(self.A, ord=np.inf)
+        self.tol = np.sqrt(self.A.shape[0]) * np.finfo(dtype).eps
+        self.n_iters = 0  # refinement iterations done by the last solve() call
+        self.used_fallback = False
+
+    def solve(self, b: NDArrayFloat) -> NDArrayFloat:
+        b = b.astype(self.dtype, copy=False)
+        b_norm = np.linalg.norm(b, ord=np.inf, axis=0)
+        x = self.low_precision_solver.solve(b).astype(self.dtype)
+        d_norm_prev = np.inf
+        self.used_fallback = False
+        for i in range(self.max_iters):
+            self.n_iters = i
+            r = b - self.A @ x
+            x_norm = np.linalg.norm(x, ord=np.inf, axis=0)
+            # Zero right-hand sides give x = 0 and r = 0, i.e. zero backward error
+            scale = self.A_norm * x_norm + b_norm
+            backward_error = np.divide(
+                np.linalg.norm(r, ord=np.inf, axis=0),
+                scale,
+                out=np.zeros_like(scale),
+                where=scale > 0,
+            )
+            if np.all(backward_error <= self.tol):
+                return x
+
+            d = self.low_precision_solver.solve(r).astype(self.dtype)
+            x += d
+            # The correction is expected to shrink by at least a constant factor
+            # each iteration, otherwise the low precision factors are too inaccurate
+            d_norm_abs = np.linalg.norm(d, ord=np.inf, axis=0)
+            d_norm = np.max(
+                np.divide(
+                    d_norm_abs,
+                    x_norm,
+                    out=np.where(d_norm_abs > 0, np.inf, 0.0),
+                    where=x_norm > 0,
+                )
+            )
+            if not np.isfinite(d_norm) or d_norm > 0.5 * d_norm_prev:
+                break
+            d_norm_prev = d_norm
+
+        self.used_fallback = True
+        if self.fallback_solver is None:
+            self.fallback_solver = LuSolver(
+                self.A, self.dtype, permute=True, use_cache=self.use_cache
+            )
+            del self.fallback_solver.A
+        return self.fallback_solver.solve(b)
 
 
 def get_A_b(a_11: float, b_1: float) -> tuple[NDArrayFloat, NDArrayFloat]:
@@ -55,3 +248,39 @@ if __name__ == "__main__":
     x = solver.solve(b)
     assert np.all(np.isclose(x, [1, -7, 4])), f"The anwser {x} is not accurate enough"
 
+    # Compare the blocked decomposition against LAPACK on a large system
+    n = 4000
+    rng = np.random.default_rng(seed=42)
+    A = rng.standard_normal((n, n))
+    b = rng.standard_normal(n)
+
+    t_start = perf_counter()
+    x = LuSolver(A, np.float64, permute=True).solve(b)
+    t_lu = perf_counter() - t_start
+
+    t_start = perf_counter()
+    x_scipy = get_scipy_solution(A, b)
+    t_scipy = perf_counter() - t_start
+
+    print(f"Blocked LU: {t_lu:.2f} s, scipy: {t_scipy:.2f} s")
+    print(f"Relative difference: {np.linalg.norm(x - x_scipy) / np.linalg.norm(x_scipy):.2e}")
+
+    # Factor once, solve many: the factors are taken from the cache and
+    # all the right-hand sides are solved in a single call
+    B = rng.standard_normal((n, 1000))
+    t_start = perf_counter()
+    X = LuSolver(A, np.float64, permute=True).solve(B)
+    t_lu_multi_rhs = perf_counter() - t_start
+    print(f"Cached LU with {B.shape[1]} right-hand sides: {t_lu_multi_rhs:.2f} s")
+
+    # Mixed precision: factor in float32, refine to float64 accuracy
+    clear_factorization_cache()
+    t_start = perf_counter()
+    solver = MixedPrecisionLuSolver(A)
+    x_mixed = solver.solve(b)
+    t_mixed = perf_counter() - t_start
+    print(
+        f"Mixed precision LU: {t_mixed:.2f} s, "
+        f"{solver.n_iters} refinement iterations, fallback: {solver.used_fallback}"
+    )
+    print(f"Relative difference: {np.linalg.norm(x_mixed - x_scipy) / np.linalg.norm(x_scipy):.2e}")
@@ -1,11 +1,13 @@
 from abc import ABC, abstractmethod
-from typing import Literal, Sequence, Type, Any
+from itertools import chain
+import math
+from typing import Any, Callable, Iterable, Iterator, Literal, Sequence, Type
 
 import numpy as np
 from numpy.typing import DTypeLike, ArrayLike
 
 
-EvaluationMethod = Literal["standard", "optimal"]
+EvaluationMethod = Literal["standard", "optimal", "compensated"]
 
 
 class Evaluator(ABC):
@@ -26,6 +28,8 @@ class Evaluator(ABC):
             self.eval_func = self._eval_standard
         elif evaluation_method == "optimal":
             self.eval_func = self._eval_optimal
+        elif evaluation_method == "compensated":
+            self.eval_func = self._eval_compensated
         else:
             raise ValueError(f"Unknown evaluation method: {evaluation_method}")
 
@@ -35,6 +39,44 @@ class Evaluator(ABC):
     @abstractmethod
     def _eval_optimal(self, *args): ...
 
+    @abstractmethod
+    def _eval_compensated(self, *args): ...
+
+
+def _two_sum(a, b):
+    """
+    Error-free transformation a + b = s + e where s = fl(a + b)
+    """
+    s = a + b
+    z = s - a
+    e = (a - (s - z)) + (b - z)
+    return s, e
+
+
+def _split(a, dtype: DTypeLike):
+    """
+    Dekker's splitting a = hi + lo where hi and lo have at most
+    half of the mantissa bits of dtype each
+    """
+    n_mantissa_bits = np.finfo(dtype).nmant + 1
+    factor = np.asarray(2 ** ((n_mantissa_bits + 1) // 2) + 1, dtype=dtype)
+    c = factor * a
+    hi = c - (c - a)
+    lo = a - hi
+    return hi, lo
+
+
+def _two_prod(a, b, b_split, dtype: DTypeLike):
+    """
+    Error-free transformation a * b = p + e where p = fl(a * b).
+    b_split is the precomputed output of _split(b, dtype)
+    """
+    p = a * b
+    a_hi, a_lo = _split(a, dtype)
+    b_hi, b_lo = b_split
+    e = a_lo * b_lo - (((p - a_hi * b_hi) - a_lo * b_hi) - a_hi * b_lo)
+    return p, e
+
 
 class Polynomial(Evaluator):
     def __init__(
@@ -48,48 +90,281 @@ class Polynomial(Evaluator):
         super().__init__(dtype, evaluation_method)
 
     def _eval_standard(self, x):
+        """
+        Naive evaluation of sum_i a_i x^i. x can be a scalar or an array,
+        all the points are evaluated at once
+        """
+        x = np.asarray(x, dtype=self.dtype)
+        res = np.zeros_like(x)
+        for i, a in enumerate(self.coeffs):
+            res += a * x**i
+        return res[()]  # unwraps 0-d arrays into scalars
 
-        ##########################
-        ### PUT YOUR CODE HERE ###
-        ##########################
+    def _eval_optimal(self, x):
+        """
+        Horner's scheme vectorized over the array of points x
+        """
+        x = np.asarray(x, dtype=self.dtype)
+        res = np.full_like(x, self.coeffs[-1])
+        for a in self.coeffs[-2::-1]:
+            res *= x
+            res += a
+        return res[()]
+
+    def _eval_compensated(self, x):
+        """
+        Compensated Horner's scheme (Graillat, Langlois, Louvet): rounding errors
+        of each multiplication and addition are captured via error-free
+        transformations and accumulated in a correction polynomial evaluated
+        alongside. The result is as accurate as if Horner's scheme was computed
+        in twice the working precision
+        """
+        x = np.asarray(x, dtype=self.dtype)
+        x_split = _split(x, self.dtype)
+        res = np.full_like(x, self.coeffs[-1])
+        correction = np.zeros_like(x)
+        for a in self.coeffs[-2::-1]:
+            p, prod_err = _two_prod(res, x, x_split, self.dtype)
+            res, sum_err = _two_sum(p, a)
+            correction *= x
+            correction += prod_err + sum_err
+        return (res + correction)[()]
+
+
+SummationMethod = Literal["naive", "kahan", "neumaier", "pairwise"]
+
+
+class StreamingSum(ABC):
+    """
+    Accumulates the sum of a stream of chunks without materializing the stream.
+    All the arithmetic is done in dtype. Sequential algorithms (naive, Kahan,
+    Neumaier) are vectorized by keeping n_lanes independent accumulators: each
+    chunk is split into rows of n_lanes elements and row i is added
+    to the accumulators at step i. Lanes are combined in result()
+    """
+    def __init__(self, dtype: DTypeLike, n_lanes: int = 1024) -> None:
+        self.dtype = dtype
+        self.n_lanes = n_lanes
 
-        pass
+    def add(self, chunk: ArrayLike) -> None:
+        chunk = np.asarray(chunk, dtype=self.dtype).reshape(-1)
+        n_pad = -len(chunk) % self.n_lanes
+        if n_pad > 0:  # zeros do not change any of the sums
+            chunk = np.concatenate((chunk, np.zeros((n_pad,), dtype=self.dtype)))
+        for row in chunk.reshape(-1, self.n_lanes):
+            self._add_row(row)
 
-    def _eval_optimal(self, x):
+    @abstractmethod
+    def _add_row(self, row): ...
+
+    @abstractmethod
+    def result(self): ...
+
+
+def _sum_lanes_compensated(values):
+    """
+    Cascaded summation of lane accumulators: values are added pairwise
+    via _two_sum and the rounding errors of all the additions are summed
+    separately, which keeps the combination of lanes as accurate
+    as the lanes themselves
+    """
+    errors = []
+    while len(values) > 1:
+        if len(values) % 2 == 1:
+            values = np.concatenate((values, np.zeros((1,), dtype=values.dtype)))
+        values, e = _two_sum(values[0::2], values[1::2])
+        errors.append(e)
+    if not errors:
+        return values[0]
+    errors = np.concatenate(errors)
+    return (values[0] + NaiveSum._sum_lanes(errors, values.dtype))[()]
+
+
+class NaiveSum(StreamingSum):
+    def __init__(self, dtype: DTypeLike, n_lanes: int = 1) -> None:
+        # A single lane reproduces the left-to-right summation
+        super().__init__(dtype, n_lanes)
+        self.s = np.zeros((n_lanes,), dtype=dtype)
+
+    def add(self, chunk: ArrayLike) -> None:
+        if self.n_lanes > 1:
+            return super().add(chunk)
+        chunk = np.asarray(chunk, dtype=self.dtype).reshape(-1)
+        if len(chunk) > 0:
+            # cumsum is strictly sequential, unlike np.sum
+            self.s = np.cumsum(np.concatenate((self.s, chunk)), dtype=self.dtype)[-1:]
+
+    def _add_row(self, row):
+        self.s += row
+
+    def result(self):
+        return NaiveSum._sum_lanes(self.s, self.dtype)
+
+    @staticmethod
+    def _sum_lanes(s, dtype: DTypeLike):
+        return np.cumsum(s, dtype=dtype)[-1]
+
+
+class KahanSum(StreamingSum):
+    def __init__(self, dtype: DTypeLike, n_lanes: int = 1024) -> None:
+        super().__init__(dtype, n_lanes)
+        self.s = np.zeros((n_lanes,), dtype=dtype)
+        self.c = np.zeros((n_lanes,), dtype=dtype)  # lost low-order bits
+
+    def _add_row(self, row):
+        y = row - self.c
+        t = self.s + y
+        self.c = (t - self.s) - y
+        self.s = t
+
+    def result(self):
+        return _sum_lanes_compensated(np.concatenate((self.s, -self.c)))
+
+
+class NeumaierSum(StreamingSum):
+    """
+    Kahan-Babuska-Neumaier summation which, unlike Kahan summation,
+    also handles summands larger than the running sum
+    """
+    def __init__(self, dtype: DTypeLike, n_lanes: int = 1024) -> None:
+        super().__init__(dtype, n_lanes)
+        self.s = np.zeros((n_lanes,), dtype=dtype)
+        self.c = np.zeros((n_lanes,), dtype=dtype)
+
+    def _add_row(self, row):
+        t = self.s + row
+        self.c += np.where(
+            np.abs(self.s) >= np.abs(row), (self.s - t) + row, (row - t) + self.s
+        )
+        self.s = t
+
+    def result(self):
+        return _sum_lanes_compensated(np.concatenate((self.s, self.c)))
+
+
+class PairwiseSum(StreamingSum):
+    """
+    Blocked pairwise summation: blocks of block_size elements are summed
+    naively, then block sums are added pairwise level by level. Across chunks,
+    partial sums are kept in a stack where two sums of the same level are merged
+    as in a binary counter, so the memory is O(log n) and the error grows
+    as O(log n) instead of O(n) for the naive summation
+    """
+    def __init__(self, dtype: DTypeLike, block_size: int = 128) -> None:
+        super().__init__(dtype, n_lanes=block_size)
+        self.stack: list[tuple[int, Any]] = []  # (level, partial sum)
+
+    def add(self, chunk: ArrayLike) -> None:
+        chunk = np.asarray(chunk, dtype=self.dtype).reshape(-1)
+        n_blocks = len(chunk) // self.n_lanes
+        if n_blocks > 0:
+            blocks = chunk[: n_blocks * self.n_lanes].reshape(n_blocks, self.n_lanes)
+            block_sums = blocks[:, 0].copy()
+            for j in range(1, self.n_lanes):
+                block_sums += blocks[:, j]
+            for level, value in PairwiseSum._reduce_pairwise(block_sums):
+                self._push(level, value)
+        tail = chunk[n_blocks * self.n_lanes :]
+        if len(tail) > 0:
+            self._add_row(tail)
+
+    def _add_row(self, row):
+        """
+        Sums a single (possibly incomplete) block naively and pushes
+        the sum as a leaf of the pairwise tree
+        """
+        self._push(0, NaiveSum._sum_lanes(row, self.dtype))
+
+    @staticmethod
+    def _reduce_pairwise(values) -> list[tuple[int, Any]]:
+        """
+        Returns the pairwise sums of the complete binary trees over values,
+        from the largest tree to the smallest one
+        """
+        partial_sums = []
+        level = 0
+        while len(values) > 0:
+            if len(values) % 2 == 1:
+                partial_sums.append((level, values[-1]))
+                values = values[:-1]
+            values = values[0::2] + values[1::2]
+            level += 1
+        return partial_sums[::-1]
+
+    def _push(self, level: int, value) -> None:
+        while self.stack and self.stack[-1][0] <= level:
+            top_level, top_value = self.stack.pop()
+            value = top_value + value
+            level = max(level, top_level) + 1
+        self.stack.append((level, value))
+
+    def result(self):
+        res = np.zeros((), dtype=self.dtype)
+        for _, value in reversed(self.stack):  # from small to large sums
+            res = res + value
+        return res[()]
+
+
+SUMMATION_METHODS: dict[str, Type[StreamingSum]] = {
+    "naive": NaiveSum,
+    "kahan": KahanSum,
+    "neumaier": NeumaierSum,
+    "pairwise": PairwiseSum,
+}
+
+
+def sum_chunks(
+    chunks: Iterable[ArrayLike], method: SummationMethod, dtype: DTypeLike
+):
+    if method not in SUMMATION_METHODS:
+        raise ValueError(f"Unknown summation method: {method}")
+    acc = SUMMATION_METHODS[method](dtype)
+    for chunk in chunks:
+        acc.add(chunk)
+    return acc.result()
 
-        ##########################
-        ### PUT YOUR CODE HERE ###
-        ##########################
 
-        pass
+def harmonic_series_chunks(
+    max_i: int, dtype: DTypeLike, chunk_size: int = 2**16
+) -> Iterator[ArrayLike]:
+    """
+    Yields 1/i for i = 1, ..., max_i in chunks
+    """
+    for start in range(1, max_i + 1, chunk_size):
+        i = np.arange(start, min(start + chunk_size, max_i + 1)).astype(dtype)
+        yield np.ones_like(i) / i
 
 
 class SeriesSum(Evaluator):
+    """
+    Sum of a series given either by max_i (harmonic series 1/i, i = 1, ..., max_i)
+    or by chunks, a callable returning a fresh iterator over chunks of the series
+    on each call. Standard evaluation uses the naive summation, optimal evaluation
+    uses optimal_method (Kahan summation by default), compensated evaluation uses
+    Neumaier summation
+    """
     def __init__(
         self,
         dtype: DTypeLike,
         evaluation_method: EvaluationMethod,
         **kwargs,
     ):
-        assert "max_i" in kwargs, "max_i must be specified"
-        self.max_i = kwargs["max_i"]
+        assert "max_i" in kwargs or "chunks" in kwargs, "max_i or chunks must be specified"
+        self.max_i = kwargs.get("max_i")
+        self.chunks: Callable[[], Iterable[ArrayLike]] = kwargs.get(
+            "chunks", lambda: harmonic_series_chunks(self.max_i, dtype)
+        )
+        self.optimal_method: SummationMethod = kwargs.get("optimal_method", "kahan")
         super().__init__(dtype, evaluation_method)
 
     def _eval_standard(self):
-
-        ##########################
-        ### PUT YOUR CODE HERE ###
-        ##########################
-
-        pass
+        return sum_chunks(self.chunks(), "naive", self.dtype)
 
     def _eval_optimal(self):
+        return sum_chunks(self.chunks(), self.optimal_method, self.dtype)
 
-        ##########################
-        ### PUT YOUR CODE HERE ###
-        ##########################
-
-        pass
+    def _eval_compensated(self):
+        return sum_chunks(self.chunks(), "neumaier", self.dtype)
 
 
 def _get_value(f, x=None):
@@ -99,7 +374,13 @@ def _get_value(f, x=None):
 def _print_relative_error(eval_by_precision: dict[int, Evaluator], val_exact, x=None):
     for n_bits in (16, 32):
         val_appr = _get_value(eval_by_precision[n_bits], x)
-        if isinstance(val_appr, Sequence):
+        if isinstance(val_appr, np.ndarray):
+            rel_err = np.abs((val_exact - val_appr) / val_exact)
+            print(
+                f"Float{n_bits} values at {val_appr.size} points. "
+                f"Max relative error: {np.max(rel_err):.2e}"
+            )
+        elif isinstance(val_appr, Sequence):
             for i in range(len(val_appr)):
                 rel_err = np.abs((val_exact[i] - val_appr[i]) / val_exact[i])
                 print(
@@ -115,7 +396,10 @@ def _print_relative_error(eval_by_precision: dict[int, Evaluator], val_exact, x=
 
 
 def run_different_precision_levels(
-    evaluator: Type[Evaluator], evaluator_params: dict[str, Any], x=None
+    evaluator: Type[Evaluator],
+    evaluator_params: dict[str, Any],
+    x=None,
+    compensated: bool = False,
 ):
     dtypes = (np.float16, np.float32, np.float64)
     eval_by_precision = {
@@ -137,21 +421,66 @@ def run_different_precision_levels(
 
     _print_relative_error(eval_by_precision, val_exact, x)
 
+    if compensated:
+        print("Relative errors for compensated evaluation")
+        for eval in eval_by_precision.values():
+            eval.reset_evaluation_method("compensated")
+
+        _print_relative_error(eval_by_precision, val_exact, x)
+
+
+def run_different_summation_methods(chunks: Callable[[], Iterable[ArrayLike]]):
+    # math.fsum is correctly rounded, so it serves as the exact value
+    val_exact = math.fsum(
+        chain.from_iterable(np.asarray(c, dtype=np.float64) for c in chunks())
+    )
+    for method in SUMMATION_METHODS:
+        print(f"Relative errors for {method} summation")
+        for n_bits, dtype in zip((16, 32, 64), (np.float16, np.float32, np.float64)):
+            val_appr = sum_chunks(chunks(), method, dtype)
+            rel_err = np.abs((val_exact - np.float64(val_appr)) / val_exact)
+            print(
+                f"Float{n_bits} value: {val_appr:.5f}. "
+                f"Relative error: {rel_err:.2e}"
+            )
+
 
 if __name__ == "__main__":
     print("=== Sum evaluation ===".upper())
     run_different_precision_levels(
         SeriesSum,
         evaluator_params=dict(max_i=200),
+        compensated=True,
     )
     print()
 
+    print("=== Streaming sum evaluation ===".upper())
+    # Telemetry-like stream: many small values whose total still fits into float16
+    def telemetry_chunks(n_chunks: int = 100, chunk_size: int = 10_000):
+        rng = np.random.default_rng(seed=42)
+        for i in range(n_chunks):
+            yield 0.01 + 0.0001 * i + 0.001 * rng.random(chunk_size)
+
+    run_different_summation_methods(telemetry_chunks)
+    print()
+
     print("=== Polynomial evaluation ===".upper())
     original_coeffs = [1.5, 10.2, -10.1, 1.0]
     x = 4.71
     run_different_precision_levels(
         Polynomial,
         evaluator_params=dict(coeffs=original_coeffs),
-        x=x
+        x=x,
+        compensated=True,
+    )
+    print()
+
+    print("=== Polynomial evaluation over many points ===".upper())
+    x = np.linspace(4.0, 5.0, 1_000_000)
+    run_different_precision_levels(
+        Polynomial,
+        evaluator_params=dict(coeffs=original_coeffs),
+        x=x,
+        compensated=True,
     )
 
@@ -0,0 +1,204 @@
+import csv
+import json
+from pathlib import Path
+import sys
+import tempfile
+from time import perf_counter
+import tracemalloc
+from typing import Any, Callable, Sequence, Type
+
+import numpy as np
+from numpy.typing import DTypeLike
+
+from practicum_9.lu import LinearSystemSolver, LuSolver, MixedPrecisionLuSolver
+from practicum_9.numerical_stability import (
+    EvaluationMethod,
+    Evaluator,
+    Polynomial,
+    SeriesSum,
+)
+from src.common import NDArrayFloat
+from src.plotting.misc import plot_accuracy_vs_throughput
+
+
+# Maps a problem size to the evaluator params and the argument of the evaluator
+# (None for evaluators without arguments)
+EvaluatorProblem = Callable[[int], tuple[dict[str, Any], Any]]
+# Maps a problem size to the matrix A and the exact solution x
+SolverProblem = Callable[[int], tuple[NDArrayFloat, NDArrayFloat]]
+
+
+def _measure(f: Callable[[], Any], n_repeats: int) -> tuple[Any, float, int]:
+    """
+    Returns the result of f, the best wall time over n_repeats runs and the peak
+    memory allocated during a separate run. The memory is measured separately
+    since tracemalloc slows down the allocations
+    """
+    wall_time = np.inf
+    for _ in range(n_repeats):
+        t_start = perf_counter()
+        res = f()
+        wall_time = min(wall_time, perf_counter() - t_start)
+
+    tracemalloc.start()
+    f()
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return res, wall_time, peak_memory
+
+
+def _relative_error(val_appr, val_exact) -> float:
+    val_appr = np.asarray(val_appr, dtype=np.float64)
+    val_exact = np.asarray(val_exact, dtype=np.float64)
+    return float(np.linalg.norm(val_appr - val_exact) / np.linalg.norm(val_exact))
+
+
+def benchmark_evaluator(
+    evaluator: Type[Evaluator],
+    problem: EvaluatorProblem,
+    sizes: Sequence[int],
+    dtypes: Sequence[DTypeLike] = (np.float16, np.float32, np.float64),
+    evaluation_methods: Sequence[EvaluationMethod] = ("standard", "optimal"),
+    n_repeats: int = 3,
+) -> list[dict[str, Any]]:
+    """
+    The exact value is computed by the optimal evaluation in long double
+    precision (which is the same as float64 on some platforms) at the argument
+    rounded to the working dtype, so the error does not include the rounding
+    of the argument itself
+    """
+    records = []
+    for size in sizes:
+        params, x = problem(size)
+        for dtype in dtypes:
+            x_rounded = None if x is None else np.asarray(x, dtype=dtype)
+            val_exact = evaluator(np.longdouble, "optimal", **params)(
+                *(() if x is None else (x_rounded.astype(np.longdouble),))
+            )
+            for method in evaluation_methods:
+                f = evaluator(dtype, method, **params)
+                args = () if x is None else (x_rounded,)
+                val_appr, wall_time, peak_memory = _measure(lambda: f(*args), n_repeats)
+                records.append(
+                    dict(
+                        name=f"{evaluator.__name__} ({method})",
+                        dtype=np.dtype(dtype).name,
+                        size=size,
+                        wall_time=wall_time,
+                        throughput=size / wall_time,
+                        peak_memory=peak_memory,
+                        rel_error=_relative_error(val_appr, val_exact),
+                    )
+                )
+    return records
+
+
+def benchmark_solver(
+    solver: Type[LinearSystemSolver],
+    problem: SolverProblem,
+    sizes: Sequence[int],
+    dtypes: Sequence[DTypeLike] = (np.float32, np.float64),
+    solver_params: dict[str, Any] | None = None,
+    n_repeats: int = 3,
+) -> list[dict[str, Any]]:
+    """
+    Each measurement includes both the decomposition and the solution.
+    The throughput is the number of unknowns solved per second
+    """
+    solver_params = solver_params or {}
+    records = []
+    for size in sizes:
+        A, x_exact = problem(size)
+        b = A @ x_exact
+        for dtype in dtypes:
+            x, wall_time, peak_memory = _measure(
+                lambda: solver(A, dtype, **solver_params).solve(b), n_repeats
+            )
+            records.append(
+                dict(
+                    name=solver.__name__,
+                    dtype=np.dtype(dtype).name,
+                    size=size,
+                    wall_time=wall_time,
+                    throughput=size / wall_time,
+                    peak_memory=peak_memory,
+                    rel_error=_relative_error(x, x_exact),
+                )
+            )
+    return records
+
+
+def write_records(records: list[dict[str, Any]], filename: Path) -> None:
+    """
+    Writes the records as CSV or JSON depending on the file extension
+    """
+    filename = Path(filename)
+    if filename.suffix == ".json":
+        with open(filename, "w") as f:
+            json.dump(records, f, indent=2)
+    elif filename.suffix == ".csv":
+        with open(filename, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(records[0].keys()))
+            writer.writeheader()
+            writer.writerows(records)
+    else:
+        raise ValueError(f"Unknown file format: {filename.suffix}")
+
+
+def print_records(records: list[dict[str, Any]]) -> None:
+    for r in records:
+        print(
+            f"{r['name']:>32} {r['dtype']:>8} size={r['size']:<8} "
+            f"time={r['wall_time']:.2e} s, peak memory={r['peak_memory'] / 2**20:.1f} MiB, "
+            f"relative error={r['rel_error']:.2e}"
+        )
+
+
+def get_well_conditioned_problem(n: int) -> tuple[NDArrayFloat, NDArrayFloat]:
+    rng = np.random.default_rng(seed=42)
+    A = rng.standard_normal((n, n)) + n * np.eye(n)
+    x = rng.standard_normal(n)
+    return A, x
+
+
+if __name__ == "__main__":
+    # Results are written to the directory given as the first argument
+    # or to a new temporary directory
+    if len(sys.argv) > 1:
+        output_dir = Path(sys.argv[1])
+    else:
+        output_dir = Path(tempfile.mkdtemp(prefix="precision_benchmark_"))
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    records = []
+    records += benchmark_evaluator(
+        Polynomial,
+        problem=lambda n: (dict(coeffs=[1.5, 10.2, -10.1, 1.0]), np.linspace(4.0, 5.0, n)),
+        sizes=[10**4, 10**5, 10**6],
+        evaluation_methods=("standard", "optimal", "compensated"),
+    )
+    records += benchmark_evaluator(
+        SeriesSum,
+        problem=lambda n: (dict(max_i=n), None),
+        sizes=[10**3, 10**4, 10**5],
+        dtypes=(np.float32, np.float64),
+        evaluation_methods=("standard", "optimal", "compensated"),
+    )
+    records += benchmark_solver(
+        LuSolver,
+        problem=get_well_conditioned_problem,
+        sizes=[250, 500, 1000],
+        solver_params=dict(permute=True, use_cache=False),
+    )
+    records += benchmark_solver(
+        MixedPrecisionLuSolver,
+        problem=get_well_conditioned_problem,
+        sizes=[250, 500, 1000],
+        dtypes=(np.float64,),
+        solver_params=dict(use_cache=False),
+    )
+    print_records(records)
+    write_records(records, output_dir / "precision_benchmark.csv")
+    write_records(records, output_dir / "precision_benchmark.json")
+    print(f"Results are written to {output_dir}")
+    plot_accuracy_vs_throughput(records)
@@ -0,0 +1,246 @@
+from collections import deque, namedtuple
+from typing import Any, Literal
+
+import numpy as np
+from numpy.typing import DTypeLike
+import networkx as nx
+import scipy.sparse
+import scipy.sparse.linalg
+
+from practicum_4.dfs_solved import GraphTraversal
+from practicum_9.lu import LinearSystemSolver
+from src.common import NDArrayInt, NDArrayFloat
+
+
+Ordering = Literal["natural", "rcm"]
+# Number of non-zero entries in A and in its factors. For Cholesky, the factor
+# is L. For LU, the factors are L and U with the unit diagonal of L counted once
+FillReport = namedtuple("FillReport", "nnz_A, predicted_nnz, actual_nnz")
+
+
+class CuthillMcKeeOrdering(GraphTraversal):
+    """
+    BFS over the adjacency graph of a sparse matrix where neighbors are visited
+    in order of increasing degree. Reversing the visiting order gives
+    the reverse Cuthill-McKee ordering which reduces the bandwidth and,
+    consequently, the fill-in of the factors
+    """
+    def __init__(self, G: nx.Graph) -> None:
+        self.order: list[Any] = []
+        super().__init__(G)
+
+    def reset(self) -> None:
+        super().reset()
+        self.order.clear()
+
+    def previsit(self, node: Any, **params) -> None:
+        self.order.append(node)
+
+    def postvisit(self, node: Any, **params) -> None:
+        pass
+
+    def run(self, node: Any) -> None:
+        queue = deque([node])
+        self.visited.add(node)
+        self.previsit(node)
+        while len(queue) > 0:
+            node = queue.popleft()
+            for neigh in sorted(self.G.neighbors(node), key=self.G.degree):
+                if neigh not in self.visited:
+                    self.visited.add(neigh)
+                    self.previsit(neigh)
+                    queue.append(neigh)
+            self.postvisit(node)
+
+    def sort(self) -> list[Any]:
+        # Each connected component is started from its node of the smallest
+        # degree which is a cheap approximation of a peripheral node
+        for node in sorted(self.G.nodes, key=self.G.degree):
+            if node not in self.visited:
+                self.run(node)
+        order = self.order[::-1]
+        self.reset()
+        return order
+
+
+def adjacency_graph(A: scipy.sparse.sparray) -> nx.Graph:
+    """
+    Undirected graph whose edges correspond to the off-diagonal non-zero
+    entries of A + A^T
+    """
+    pattern = scipy.sparse.csr_array(A, dtype=bool)
+    pattern = pattern + pattern.T
+    pattern.setdiag(False)
+    pattern.eliminate_zeros()
+    G = nx.from_scipy_sparse_array(pattern)
+    G.add_nodes_from(range(A.shape[0]))
+    return G
+
+
+def fill_reducing_ordering(A: scipy.sparse.sparray, ordering: Ordering) -> NDArrayInt:
+    if ordering == "natural":
+        return np.arange(A.shape[0])
+    elif ordering == "rcm":
+        return np.array(CuthillMcKeeOrdering(adjacency_graph(A)).sort(), dtype=np.int_)
+    else:
+        raise ValueError(f"Unknown ordering: {ordering}")
+
+
+def elimination_tree(A: scipy.sparse.sparray) -> NDArrayInt:
+    """
+    Computes the elimination tree of a matrix with symmetric pattern via
+    Liu's algorithm with path compression. parent[j] is the parent of column j,
+    -1 for roots
+    """
+    A = scipy.sparse.csc_array(A)
+    n = A.shape[0]
+    parent = np.full((n,), -1, dtype=np.int_)
+    ancestor = np.full((n,), -1, dtype=np.int_)
+    for j in range(n):
+        for i in A.indices[A.indptr[j] : A.indptr[j + 1]]:
+            # Walk from i up to the root of its current subtree
+            # and hang the root under j
+            while i != -1 and i < j:
+                i_next = ancestor[i]
+                ancestor[i] = j
+                if i_next == -1:
+                    parent[i] = j
+                i = i_next
+    return parent
+
+
+def symbolic_cholesky(A: scipy.sparse.sparray) -> NDArrayInt:
+    """
+    Symbolic Cholesky factorization: returns the number of non-zero entries
+    in each column of L (including the diagonal) for a matrix with symmetric
+    pattern. The pattern of row i of L is the union of the paths in the
+    elimination tree going from each k, such that a_ik != 0 and k < i, up to i
+    """
+    A = scipy.sparse.csc_array(A)
+    n = A.shape[0]
+    parent = elimination_tree(A)
+    col_counts = np.ones((n,), dtype=np.int_)
+    mark = np.full((n,), -1, dtype=np.int_)
+    for i in range(n):
+        mark[i] = i
+        for k in A.indices[A.indptr[i] : A.indptr[i + 1]]:
+            if k > i:
+                continue
+            while mark[k] != i:
+                col_counts[k] += 1
+                mark[k] = i
+                k = parent[k]
+    return col_counts
+
+
+class SparseLuSolver(LinearSystemSolver):
+    """
+    LU decomposition of a sparse matrix PAP^T with P given by a fill-reducing
+    ordering. The symbolic factorization of the pattern of A + A^T predicts
+    the fill-in assuming no pivoting, whereas the numeric factorization
+    (SuperLU) may pivot for stability and thus produce a different fill-in
+    """
+    def __init__(
+        self,
+        A: scipy.sparse.sparray,
+        dtype: DTypeLike,
+        ordering: Ordering = "rcm",
+    ) -> None:
+        super().__init__(scipy.sparse.csc_array(A), dtype)
+        self.ordering = ordering
+        self.perm = fill_reducing_ordering(self.A, ordering)
+        A_perm = self.A[self.perm][:, self.perm]
+        self.fill = self._predict_fill(A_perm)
+        self.factors = self._decompose(A_perm)
+        self.fill = self.fill._replace(actual_nnz=self._actual_fill())
+
+    def solve(self, b: NDArrayFloat) -> NDArrayFloat:
+        x = np.empty_like(b, dtype=self.dtype)
+        x[self.perm] = self.factors.solve(b[self.perm].astype(self.dtype))
+        return x
+
+    def _predict_fill(self, A_perm: scipy.sparse.sparray) -> FillReport:
+        pattern = scipy.sparse.csc_array(A_perm, dtype=bool)
+        nnz_L = int(np.sum(symbolic_cholesky(pattern + pattern.T)))
+        # L and U have the same pattern up to transposition when no pivoting occurs
+        return FillReport(
+            nnz_A=self.A.nnz, predicted_nnz=2 * nnz_L - self.A.shape[0], actual_nnz=None
+        )
+
+    def _decompose(self, A_perm: scipy.sparse.sparray) -> scipy.sparse.linalg.SuperLU:
+        # The columns are already permuted, so SuperLU must keep them as is
+        return scipy.sparse.linalg.splu(A_perm, permc_spec="NATURAL")
+
+    def _actual_fill(self) -> int:
+        return self.factors.L.nnz + self.factors.U.nnz - self.A.shape[0]
+
+
+class SparseCholeskySolver(SparseLuSolver):
+    """
+    Cholesky decomposition PAP^T = LL^T of a sparse symmetric positive definite
+    matrix. Without pivoting, PAP^T = L'U with U = DL'^T, so L = L'D^{1/2}
+    """
+    def __init__(
+        self,
+        A: scipy.sparse.sparray,
+        dtype: DTypeLike,
+        ordering: Ordering = "rcm",
+    ) -> None:
+        super().__init__(A, dtype, ordering)
+        d = self.factors.U.diagonal()
+        if np.any(d <= 0):
+            raise np.linalg.LinAlgError(
+                "Matrix is not positive definite: non-positive pivot at index "
+                f"{int(np.argmax(d <= 0))} of the permuted matrix"
+            )
+        self.L = self.factors.L @ scipy.sparse.diags_array(np.sqrt(d))
+
+    def _predict_fill(self, A_perm: scipy.sparse.sparray) -> FillReport:
+        return FillReport(
+            nnz_A=self.A.nnz,
+            predicted_nnz=int(np.sum(symbolic_cholesky(A_perm))),
+            actual_nnz=None,
+        )
+
+    def _decompose(self, A_perm: scipy.sparse.sparray) -> scipy.sparse.linalg.SuperLU:
+        # Disabling pivoting keeps the symmetric structure of the decomposition
+        return scipy.sparse.linalg.splu(
+            A_perm,
+            permc_spec="NATURAL",
+            diag_pivot_thresh=0.0,
+            options=dict(SymmetricMode=True),
+        )
+
+    def _actual_fill(self) -> int:
+        return self.factors.L.nnz
+
+
+def get_poisson_matrix(n: int) -> scipy.sparse.csc_array:
+    """
+    Discrete Laplacian on an n x n grid
+    """
+    T = scipy.sparse.diags_array([-1.0, 2.0, -1.0], offsets=[-1, 0, 1], shape=(n, n))
+    I = scipy.sparse.eye_array(n)
+    return scipy.sparse.csc_array(scipy.sparse.kron(I, T) + scipy.sparse.kron(T, I))
+
+
+if __name__ == "__main__":
+    # Shuffle the grid nodes to destroy the natural banded structure
+    A = get_poisson_matrix(40)
+    rng = np.random.default_rng(seed=42)
+    shuffle = rng.permutation(A.shape[0])
+    A = A[shuffle][:, shuffle]
+    b = rng.standard_normal(A.shape[0])
+
+    for solver_cls in (SparseLuSolver, SparseCholeskySolver):
+        for ordering in ("natural", "rcm"):
+            solver = solver_cls(A, np.float64, ordering=ordering)
+            x = solver.solve(b)
+            res = np.linalg.norm(A @ x - b) / np.linalg.norm(b)
+            print(
+                f"{solver_cls.__name__}, {ordering} ordering: "
+                f"nnz(A) = {solver.fill.nnz_A}, "
+                f"predicted nnz = {solver.fill.predicted_nnz}, "
+                f"actual nnz = {solver.fill.actual_nnz}, "
+                f"relative residual = {res:.2e}"
+            )
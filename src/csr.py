@@ -0,0 +1,130 @@
+from collections import namedtuple
+from typing import Optional
+
+import numpy as np
+import networkx as nx
+import scipy.sparse
+
+from src.common import AnyNxGraph, NDArrayFloat, NDArrayInt
+
+
+# Compressed sparse row (CSR) representation of a graph: the successors of
+# node i are indices[indptr[i]:indptr[i+1]] with the corresponding edge weights
+# in weights (ones for unweighted graphs). nodes maps node indices back
+# to the node labels of the original graph
+CsrGraph = namedtuple("CsrGraph", "indptr, indices, weights, nodes")
+
+
+def to_csr(G: AnyNxGraph, weight: Optional[str] = None) -> CsrGraph:
+    """
+    Converts a networkx graph into CSR arrays. Undirected edges are stored
+    in both directions
+    """
+    nodes = list(G.nodes)
+    A = nx.to_scipy_sparse_array(G, nodelist=nodes, weight=weight, format="csr")
+    A.sort_indices()
+    return CsrGraph(
+        indptr=A.indptr.astype(np.int_),
+        indices=A.indices.astype(np.int_),
+        weights=A.data.astype(np.float64),
+        nodes=nodes,
+    )
+
+
+def csr_from_edges(
+    u: np.ndarray, v: np.ndarray, w: Optional[NDArrayFloat] = None, directed: bool = True
+) -> CsrGraph:
+    """
+    Builds CSR arrays straight from arrays of edge endpoints (e.g., returned
+    by read_weighted_edgelist) without creating a networkx graph. As in
+    networkx, nodes are numbered in the order of their first appearance and
+    the last of duplicate edges wins. Undirected edges are stored in both
+    directions. Node labels are returned as an array
+    """
+    labels, first, inverse = np.unique(
+        np.stack([u, v], axis=1).reshape(-1), return_index=True, return_inverse=True
+    )
+    order = np.argsort(first)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    ends = rank[inverse.reshape(-1)].reshape(-1, 2)
+    src, dst = ends[:, 0], ends[:, 1]
+    if not directed:
+        src, dst = np.minimum(src, dst), np.maximum(src, dst)
+    w = np.ones((len(src),), dtype=np.float64) if w is None else np.asarray(w, dtype=np.float64)
+    n = len(labels)
+
+    # Positions of the last occurrences of the edges sorted by (src, dst)
+    keys = src * n + dst
+    _, last = np.unique(keys[::-1], return_index=True)
+    last = len(keys) - 1 - last
+    src, dst, w = src[last], dst[last], w[last]
+    if not directed:
+        mirrored = src != dst
+        src, dst, w = (
+            np.concatenate([src, dst[mirrored]]),
+            np.concatenate([dst, src[mirrored]]),
+            np.concatenate([w, w[mirrored]]),
+        )
+        by_row = np.lexsort((dst, src))
+        src, dst, w = src[by_row], dst[by_row], w[by_row]
+
+    indptr = np.zeros((n + 1,), dtype=np.int_)
+    np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+    return CsrGraph(
+        indptr=indptr, indices=dst.astype(np.int_), weights=w, nodes=labels[order]
+    )
+
+
+def transpose_csr(csr: CsrGraph) -> CsrGraph:
+    """
+    CSR arrays of the graph with reversed edges, i.e. the predecessors
+    of node i are indices[indptr[i]:indptr[i+1]] in the returned graph
+    """
+    n = len(csr.nodes)
+    A = scipy.sparse.csr_array((csr.weights, csr.indices, csr.indptr), shape=(n, n))
+    A_t = scipy.sparse.csr_array(A.T)
+    A_t.sort_indices()
+    return CsrGraph(
+        indptr=A_t.indptr.astype(np.int_),
+        indices=A_t.indices.astype(np.int_),
+        weights=A_t.data.astype(np.float64),
+        nodes=csr.nodes,
+    )
+
+
+def from_csr(
+    csr: CsrGraph, directed: bool, weight: Optional[str] = "weight"
+) -> AnyNxGraph:
+    """
+    Converts CSR arrays back into a networkx graph. Edge weights are stored
+    in the weight attribute unless weight is None
+    """
+    n = len(csr.nodes)
+    A = scipy.sparse.csr_array((csr.weights, csr.indices, csr.indptr), shape=(n, n))
+    G = nx.from_scipy_sparse_array(
+        A, create_using=nx.DiGraph if directed else nx.Graph, edge_attribute=weight
+    )
+    if weight is None:
+        for _, _, data in G.edges(data=True):
+            data.clear()
+    nodes = csr.nodes.tolist() if isinstance(csr.nodes, np.ndarray) else csr.nodes
+    return nx.relabel_nodes(G, dict(enumerate(nodes)))
+
+
+def gather_neighbors(
+    csr: CsrGraph, frontier: NDArrayInt
+) -> tuple[NDArrayInt, NDArrayInt, NDArrayInt]:
+    """
+    Returns all the edges going out of the frontier nodes as arrays
+    (source nodes, target nodes, edge indices in csr.indices) without
+    looping over the frontier in python
+    """
+    starts = csr.indptr[frontier]
+    counts = csr.indptr[frontier + 1] - starts
+    n_edges = int(counts.sum())
+    src = np.repeat(frontier, counts)
+    # Position of each gathered edge relative to the start of its row
+    offsets = np.arange(n_edges) - np.repeat(np.cumsum(counts) - counts, counts)
+    edge_ids = np.repeat(starts, counts) + offsets
+    return src, csr.indices[edge_ids], edge_ids
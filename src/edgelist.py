@@ -0,0 +1,145 @@
+from ast import literal_eval
+from concurrent.futures import ProcessPoolExecutor
+import os
+from pathlib import Path
+import re
+from typing import Optional
+
+import numpy as np
+from numpy.typing import DTypeLike
+
+from src.common import NDArrayFloat
+
+
+# Matches a line "u v", "u v w" or "u v {'weight': w}" (groups 1-4)
+# or, otherwise, any other non-empty line (group 5) which is then parsed
+# in the slow way. Comments make a line fall into the slow path as well
+_EDGE_RE = re.compile(
+    rb"^[ \t]*([^\s#]+)[ \t]+([^\s#]+)[ \t]*"
+    rb"(?:\{['\"]weight['\"]:[ \t]*([^\s,#{}]+)[ \t]*\}|([^\s#{}]+))?[ \t]*\r?$"
+    rb"|^(.+)$",
+    re.MULTILINE,
+)
+
+
+def _parse_line_slow(line: str) -> Optional[tuple[str, str, float]]:
+    """
+    Parses a line in the same way as nx.read_edgelist does. Returns None
+    for empty lines and comments
+    """
+    line = line.split("#")[0].strip()
+    if not line:
+        return None
+    tokens = line.split(maxsplit=2)
+    if len(tokens) < 2:
+        raise ValueError(f"Failed to parse edge: {line}")
+    data = literal_eval(tokens[2]) if len(tokens) == 3 else {}
+    w = data.get("weight", 1.0) if isinstance(data, dict) else data
+    return tokens[0], tokens[1], float(w)
+
+
+def _convert_nodes(labels: np.ndarray, nodetype: DTypeLike) -> np.ndarray:
+    if labels.dtype.kind == "S" and np.issubdtype(np.dtype(nodetype), np.str_):
+        return np.char.decode(labels)
+    return labels.astype(nodetype)
+
+
+def _parse_block(block: bytes, nodetype: DTypeLike) -> tuple[np.ndarray, np.ndarray, NDArrayFloat]:
+    matches = _EDGE_RE.findall(block)
+    if not matches:
+        empty = np.empty((0,), dtype=nodetype)
+        return empty, empty.copy(), np.empty((0,), dtype=np.float64)
+    fields = np.array(matches, dtype=bytes)
+    is_fast = fields[:, 4] == b""
+    fast = fields[is_fast]
+    # Weight is given either as a dict literal or as a bare number
+    w_str = np.where(fast[:, 2] != b"", fast[:, 2], fast[:, 3])
+    w_fast = np.ones((len(fast),), dtype=np.float64)
+    has_w = w_str != b""
+    w_fast[has_w] = w_str[has_w].astype(np.float64)
+    if is_fast.all():
+        u = _convert_nodes(fast[:, 0], nodetype)
+        v = _convert_nodes(fast[:, 1], nodetype)
+        return u, v, w_fast
+
+    # Lines parsed in the slow way are merged back preserving the order
+    slow_edges = [_parse_line_slow(line.decode()) for line in fields[~is_fast, 4]]
+    is_edge = np.array([edge is not None for edge in slow_edges], dtype=bool)
+    slow_edges = [edge for edge in slow_edges if edge is not None]
+    keep = is_fast.copy()
+    keep[np.flatnonzero(~is_fast)[is_edge]] = True
+    is_fast = is_fast[keep]
+    # Strings of unknown length are first collected as objects
+    is_str = np.issubdtype(np.dtype(nodetype), np.str_)
+    u = np.empty((len(is_fast),), dtype=object if is_str else nodetype)
+    v = np.empty_like(u)
+    w = np.empty((len(is_fast),), dtype=np.float64)
+    u[is_fast] = _convert_nodes(fast[:, 0], nodetype)
+    v[is_fast] = _convert_nodes(fast[:, 1], nodetype)
+    w[is_fast] = w_fast
+    if slow_edges:
+        u_slow, v_slow, w_slow = zip(*slow_edges)
+        u[~is_fast] = _convert_nodes(np.array(u_slow), nodetype)
+        v[~is_fast] = _convert_nodes(np.array(v_slow), nodetype)
+        w[~is_fast] = w_slow
+    return u.astype(nodetype), v.astype(nodetype), w
+
+
+def _parse_range(
+    path: Path, start: int, end: int, nodetype: DTypeLike
+) -> tuple[np.ndarray, np.ndarray, NDArrayFloat]:
+    with open(path, "rb") as f:
+        f.seek(start)
+        return _parse_block(f.read(end - start), nodetype)
+
+
+def split_into_line_ranges(path: Path, n_ranges: int) -> list[tuple[int, int]]:
+    """
+    Splits the file into byte ranges of roughly equal size such that each
+    range starts at the beginning of a line
+    """
+    size = os.path.getsize(path)
+    bounds = [0]
+    with open(path, "rb") as f:
+        for i in range(1, n_ranges):
+            pos = max(size * i // n_ranges, bounds[-1])
+            f.seek(pos)
+            if pos > 0:
+                f.readline()  # move to the start of the next line
+            bounds.append(min(f.tell(), size))
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+
+def read_weighted_edgelist(
+    path: Path,
+    nodetype: DTypeLike = np.int64,
+    n_workers: Optional[int] = None,
+    chunk_bytes: int = 2**26,
+) -> tuple[np.ndarray, np.ndarray, NDArrayFloat]:
+    """
+    Reads an edge list in the format written by nx.write_edgelist, i.e. lines
+    "u v {'weight': w}", and returns arrays (u, v, w) in the order of lines.
+    Lines "u v w" and "u v" (weight 1) are accepted as well. The file is split
+    into byte ranges of at most chunk_bytes which are parsed in n_workers
+    processes (all CPUs by default). Lines with other edge attributes fall
+    back to literal_eval, the other attributes are ignored
+    """
+    path = Path(path)
+    n_workers = n_workers or os.cpu_count() or 1
+    size = os.path.getsize(path)
+    n_ranges = max(n_workers, -(-size // chunk_bytes))
+    ranges = split_into_line_ranges(path, n_ranges)
+    starts, ends = zip(*ranges) if ranges else ((), ())
+    n = len(ranges)
+    if n_workers == 1 or n <= 1:
+        parts = list(map(_parse_range, [path] * n, starts, ends, [nodetype] * n))
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            parts = list(
+                executor.map(_parse_range, [path] * n, starts, ends, [nodetype] * n)
+            )
+    if not parts:
+        parts = [_parse_block(b"", nodetype)]
+    u, v, w = (np.concatenate(arrays) for arrays in zip(*parts))
+    return u, v, w
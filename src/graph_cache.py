@@ -0,0 +1,238 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+import shutil
+from typing import Any, Callable, Optional
+
+import numpy as np
+from numpy.typing import DTypeLike
+
+from src.common import AnyNxGraph
+from src.csr import CsrGraph, csr_from_edges, from_csr, to_csr
+from src.edgelist import read_weighted_edgelist
+
+
+# Binary cache of a graph is a directory containing header.json and
+# indptr.npy, indices.npy, weights.npy, nodes.npy. The header stores
+# the stamp of the source file (size, mtime and content hash) used
+# to invalidate the cache once the source changes and the parse options
+# (reader, weight, directed, nodetype) the cache was built with
+FORMAT_VERSION = 2
+_ARRAYS = ("indptr", "indices", "weights", "nodes")
+
+
+def _file_hash(path: Path, block_size: int = 2**20) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        while block := f.read(block_size):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _source_stamp(path: Path, with_hash: bool) -> dict[str, Any]:
+    stat = os.stat(path)
+    stamp = dict(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+    if with_hash:
+        stamp["hash"] = _file_hash(path)
+    return stamp
+
+
+def _write_header(cache_dir: Path, header: dict[str, Any]) -> None:
+    # The header is written aside and then renamed, so that a crash
+    # never leaves a partially written header
+    tmp_path = Path(cache_dir) / f"header.json.tmp{os.getpid()}"
+    with open(tmp_path, "w") as f:
+        json.dump(header, f, indent=2)
+    os.replace(tmp_path, Path(cache_dir) / "header.json")
+
+
+def _reader_name(read_graph: Optional[Callable[[Path], AnyNxGraph]]) -> str:
+    """
+    Identifies the parser in the cache header. For partials, the bound
+    arguments are included since they change the parsed graph (e.g., nodetype)
+    """
+    if read_graph is None:
+        return "read_weighted_edgelist"
+    func = getattr(read_graph, "func", read_graph)
+    name = f"{getattr(func, '__module__', '')}.{getattr(func, '__qualname__', repr(func))}"
+    args = getattr(read_graph, "args", ())
+    keywords = getattr(read_graph, "keywords", {})
+    if args or keywords:
+        name += f"({args!r}, {sorted(keywords.items())!r})"
+    return name
+
+
+def _parse_options(
+    read_graph: Optional[Callable[[Path], AnyNxGraph]],
+    weight: Optional[str],
+    directed: bool,
+    nodetype: DTypeLike,
+) -> dict[str, Any]:
+    """
+    Options which change the cached arrays. directed and nodetype are only
+    used by read_weighted_edgelist, a custom read_graph decides them itself
+    """
+    options: dict[str, Any] = dict(reader=_reader_name(read_graph), weight=weight)
+    if read_graph is None:
+        options.update(directed=directed, nodetype=np.dtype(nodetype).str)
+    return options
+
+
+def default_cache_dir(path: Path) -> Path:
+    path = Path(path)
+    return path.with_name(path.name + ".cache")
+
+
+def save_csr(
+    csr: CsrGraph,
+    cache_dir: Path,
+    directed: bool,
+    source_stamp: Optional[dict[str, Any]] = None,
+    options: Optional[dict[str, Any]] = None,
+) -> None:
+    """
+    Writes the CSR arrays into cache_dir. Node labels must have the same
+    simple type (e.g., all ints or all strings) to be stored without pickling.
+    The directory is written aside and then renamed, so a reader never sees
+    a partially written cache
+    """
+    cache_dir = Path(cache_dir)
+    nodes = np.asarray(csr.nodes)
+    if nodes.dtype == object:
+        raise ValueError("Node labels must be all ints, all floats or all strings")
+    tmp_dir = cache_dir.with_name(cache_dir.name + f".tmp{os.getpid()}")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+    arrays = dict(
+        indptr=csr.indptr, indices=csr.indices, weights=csr.weights, nodes=nodes
+    )
+    for name, arr in arrays.items():
+        np.save(tmp_dir / f"{name}.npy", arr, allow_pickle=False)
+    header = dict(
+        format_version=FORMAT_VERSION,
+        n_nodes=len(nodes),
+        n_edges=len(csr.indices),
+        directed=directed,
+        options=options,
+        source=source_stamp,
+    )
+    _write_header(tmp_dir, header)
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    os.replace(tmp_dir, cache_dir)
+
+
+def read_header(cache_dir: Path) -> Optional[dict[str, Any]]:
+    """
+    Returns None if there is no readable cache in cache_dir
+    """
+    try:
+        with open(Path(cache_dir) / "header.json") as f:
+            header = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if header.get("format_version") != FORMAT_VERSION:
+        return None
+    return header
+
+
+def load_csr(cache_dir: Path, mmap: bool = True) -> CsrGraph:
+    """
+    Loads the CSR arrays from cache_dir. With mmap=True, the arrays are
+    memory-mapped read-only, so loading takes constant time and the data
+    is read from disk lazily on access
+    """
+    cache_dir = Path(cache_dir)
+    if read_header(cache_dir) is None:
+        raise ValueError(f"No valid graph cache in {cache_dir}")
+    mmap_mode = "r" if mmap else None
+    arrays = {
+        name: np.load(cache_dir / f"{name}.npy", mmap_mode=mmap_mode, allow_pickle=False)
+        for name in _ARRAYS
+    }
+    return CsrGraph(**arrays)
+
+
+def is_cache_valid(path: Path, cache_dir: Path) -> bool:
+    """
+    The cache is valid if the size and the modification time of the source
+    are the same as when the cache was built. If only the modification time
+    differs (e.g., the file was touched or copied), the content hash decides
+    """
+    header = read_header(cache_dir)
+    if header is None or header["source"] is None:
+        return False
+    cached_stamp = header["source"]
+    stamp = _source_stamp(path, with_hash=False)
+    if stamp["size"] != cached_stamp["size"]:
+        return False
+    if stamp["mtime_ns"] == cached_stamp["mtime_ns"]:
+        return True
+    if _file_hash(path) != cached_stamp["hash"]:
+        return False
+    # Remember the new modification time to skip hashing next time
+    header["source"]["mtime_ns"] = stamp["mtime_ns"]
+    _write_header(cache_dir, header)
+    return True
+
+
+def load_graph_cached(
+    path: Path,
+    read_graph: Optional[Callable[[Path], AnyNxGraph]] = None,
+    weight: Optional[str] = None,
+    cache_dir: Optional[Path] = None,
+    mmap: bool = True,
+    directed: bool = False,
+    nodetype: DTypeLike = str,
+) -> CsrGraph:
+    """
+    Returns the CSR arrays of the graph stored in the text file path.
+    The file is parsed only if there is no valid binary cache for it,
+    otherwise the cache is memory-mapped. By default, the edge list is parsed
+    by read_weighted_edgelist straight into arrays, so no networkx graph
+    is built, and directed and nodetype describe the graph. Alternatively,
+    read_graph (e.g., a partial of nx.read_edgelist) parses the file into
+    a networkx graph. With weight=None, all the weights are ones.
+    By default, the cache is stored next to the source in a directory
+    with suffix .cache
+    """
+    path = Path(path)
+    cache_dir = default_cache_dir(path) if cache_dir is None else Path(cache_dir)
+    header = read_header(cache_dir)
+    # The cache built with other parse options is rebuilt as well
+    options = _parse_options(read_graph, weight, directed, nodetype)
+    same_options = header is not None and header.get("options") == options
+    if not same_options or not is_cache_valid(path, cache_dir):
+        # Stamp is taken before reading so that the modifications made
+        # during reading invalidate the cache
+        stamp = _source_stamp(path, with_hash=True)
+        if read_graph is None:
+            u, v, w = read_weighted_edgelist(path, nodetype=nodetype)
+            csr = csr_from_edges(u, v, w if weight is not None else None, directed=directed)
+        else:
+            G = read_graph(path)
+            csr = to_csr(G, weight=weight)
+            directed = G.is_directed()
+        save_csr(csr, cache_dir, directed, stamp, options=options)
+    return load_csr(cache_dir, mmap=mmap)
+
+
+def read_graph_cached(
+    path: Path,
+    directed: bool = False,
+    weight: Optional[str] = "weight",
+    nodetype: DTypeLike = str,
+    cache_dir: Optional[Path] = None,
+) -> AnyNxGraph:
+    """
+    Replacement of nx.read_edgelist for large graphs which parses the file
+    only once and then builds the networkx graph from the cached CSR arrays.
+    Unlike nx.read_edgelist, neighbors come in the order of node indices
+    rather than in the file order, and weights are stored as floats
+    in the weight attribute (no attributes if weight is None). Small graphs
+    whose traversal order matters are better read by nx.read_edgelist
+    """
+    csr = load_graph_cached(
+        path, weight=weight, cache_dir=cache_dir, directed=directed, nodetype=nodetype
+    )
+    return from_csr(csr, directed=directed, weight=weight)
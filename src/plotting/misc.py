@@ -34,3 +34,33 @@ def plot_loss_history(
     ax.grid()
     fig.tight_layout()
     plt.show()
+
+
+def plot_accuracy_vs_throughput(
+    records: list[dict[str, Any]],
+    xlabel="throughput, items/s",
+    ylabel="relative error",
+    filename: Union[str, None] = None,
+) -> None:
+    """
+    Each record must contain "name", "dtype", "throughput" and "rel_error".
+    Records sharing the name and dtype are plotted as a single line
+    """
+    fig, ax = plt.subplots(1, 1, figsize=(12, 6))
+    series: dict[tuple[str, str], list[tuple[float, float]]] = {}
+    for r in records:
+        series.setdefault((r["name"], r["dtype"]), []).append(
+            (r["throughput"], r["rel_error"])
+        )
+    for (name, dtype), points in series.items():
+        throughput, rel_error = zip(*points)
+        ax.loglog(throughput, rel_error, "o--", label=f"{name}, {dtype}")
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.grid()
+    ax.legend()
+    fig.tight_layout()
+    if filename is not None:
+        fig.savefig(filename)
+    else:
+        plt.show()
@@ -0,0 +1,320 @@
+from collections import OrderedDict, namedtuple
+import hashlib
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Callable, Hashable, Optional
+
+import numpy as np
+
+from src.common import AnyNxGraph
+from src.csr import to_csr
+
+
+# pred[i] is the index of the node preceding node i on the shortest path from
+# the source (-1 for the source and unreachable nodes) and dist[i] is the length
+# of this path. Node indices refer to the order of G.nodes
+ShortestPathTree = namedtuple("ShortestPathTree", "pred, dist")
+# (graph version, algorithm name, source, target or None)
+CacheKey = tuple[str, str, Any, Any]
+
+
+def graph_fingerprint(G: AnyNxGraph, weight: Optional[str] = "weight") -> str:
+    """
+    Hash of the graph structure and edge weights. Any change of the graph
+    changes the fingerprint, so cached results of the old graph are never hit
+    """
+    csr = to_csr(G, weight=weight)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr((G.is_directed(), csr.nodes)).encode())
+    for arr in (csr.indptr, csr.indices, csr.weights):
+        h.update(np.ascontiguousarray(arr).tobytes())
+    return h.hexdigest()
+
+
+def tree_from_paths(
+    nodes: list[Any], source: Any, dist: dict[Any, float], paths: dict[Any, set[tuple[Any, Any]]]
+) -> ShortestPathTree:
+    """
+    Converts the results of the shortest path classes of the course (distances
+    and shortest paths as sets of edges) into predecessor and distance arrays
+    """
+    node_to_idx = {node: i for i, node in enumerate(nodes)}
+    pred = np.full((len(nodes),), -1, dtype=np.int_)
+    dist_arr = np.full((len(nodes),), np.inf)
+    for node, d in dist.items():
+        dist_arr[node_to_idx[node]] = d
+    for node, edges in paths.items():
+        for u, v in edges:
+            if v == node and node != source:
+                pred[node_to_idx[node]] = node_to_idx[u]
+    return ShortestPathTree(pred=pred, dist=dist_arr)
+
+
+def path_from_tree(tree: ShortestPathTree, target: int) -> list[int]:
+    """
+    Node indices of the shortest path ending at target (empty if unreachable)
+    """
+    if not np.isfinite(tree.dist[target]):
+        return []
+    path = [target]
+    while tree.pred[path[-1]] != -1:
+        path.append(int(tree.pred[path[-1]]))
+    return path[::-1]
+
+
+def _canonical_node(node: Any) -> Any:
+    """
+    Converts numpy scalars to python ones and integral numbers to int
+    (recursively for tuples), so the nodes which are equal as dict keys,
+    e.g. 3, 3.0 and np.int64(3), also give the same segment name
+    """
+    if isinstance(node, np.generic):
+        node = node.item()
+    if isinstance(node, (bool, float)) and float(node).is_integer():
+        return int(node)
+    if isinstance(node, tuple):
+        return tuple(_canonical_node(n) for n in node)
+    return node
+
+
+def _canonical_key(key: CacheKey) -> CacheKey:
+    version, algorithm, source, target = key
+    return (version, algorithm, _canonical_node(source), _canonical_node(target))
+
+
+def _segment_name(key: CacheKey) -> str:
+    return "spc_" + hashlib.blake2b(repr(key).encode(), digest_size=12).hexdigest()
+
+
+def _set_tracked(shm: shared_memory.SharedMemory, tracked: bool) -> None:
+    """
+    Registers or unregisters the segment in the resource tracker, which unlinks
+    all the segments registered by a process when it exits. Before python 3.13,
+    SharedMemory registers the segment even when attaching to an existing one,
+    so a reader has to unregister it to not destroy the segment of another
+    process. The tracker expects the name with the leading slash, which is only
+    available as the private attribute _name
+    """
+    if tracked:
+        resource_tracker.register(shm._name, "shared_memory")
+    else:
+        resource_tracker.unregister(shm._name, "shared_memory")
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    shm = shared_memory.SharedMemory(name=name)
+    _set_tracked(shm, tracked=False)
+    return shm
+
+
+# Layout: ready flag (int64), n (int64), pred (n x int64), dist (n x float64).
+# The flag is written last, so a segment which is still being filled
+# by another process is never read
+_HEADER_BYTES = 16
+
+
+def _is_ready(shm: shared_memory.SharedMemory) -> bool:
+    return bool(np.ndarray((1,), dtype=np.int64, buffer=shm.buf)[0] == 1)
+
+
+def _write_tree(shm: shared_memory.SharedMemory, tree: ShortestPathTree) -> None:
+    n = len(tree.pred)
+    header = np.ndarray((2,), dtype=np.int64, buffer=shm.buf)
+    header[1] = n
+    np.ndarray((n,), dtype=np.int64, buffer=shm.buf, offset=_HEADER_BYTES)[:] = tree.pred
+    np.ndarray((n,), dtype=np.float64, buffer=shm.buf, offset=_HEADER_BYTES + 8 * n)[:] = tree.dist
+    header[0] = 1
+
+
+def _tree_views(shm: shared_memory.SharedMemory) -> ShortestPathTree:
+    n = int(np.ndarray((2,), dtype=np.int64, buffer=shm.buf)[1])
+    pred = np.ndarray((n,), dtype=np.int64, buffer=shm.buf, offset=_HEADER_BYTES)
+    dist = np.ndarray((n,), dtype=np.float64, buffer=shm.buf, offset=_HEADER_BYTES + 8 * n)
+    pred.flags.writeable = False
+    dist.flags.writeable = False
+    return ShortestPathTree(pred=pred, dist=dist)
+
+
+class ShortestPathCache:
+    """
+    LRU cache of shortest path trees keyed by (graph version, algorithm,
+    source, target). Target is None for single-source algorithms. Entries
+    are evicted when either max_entries or max_bytes is exceeded.
+
+    The graph version is either a counter, which the code modifying the graph
+    bumps via bump_version() so that a query costs O(1), or the fingerprint
+    of the graph computed by update_graph() on request. Counters are local
+    to a process, so with shared=True they are only consistent if all the
+    processes apply the same modifications to the graph known as graph_id.
+
+    With shared=True, the trees are stored in shared memory segments named
+    after the key, so a process missing a key in its own cache attaches
+    to the segment created by another process instead of recomputing.
+    A segment becomes visible to other processes once its ready flag is set,
+    i.e. after the whole tree has been written. Segments are unlinked
+    by the process that created them upon eviction or close(), other processes
+    keep their mappings valid until they evict the entry themselves
+    """
+    def __init__(
+        self, max_entries: int = 128, max_bytes: int = 2**28, shared: bool = False
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.shared = shared
+        # key -> (tree, shared memory segment or None, whether this process owns it)
+        self._entries: OrderedDict[
+            CacheKey, tuple[ShortestPathTree, Optional[shared_memory.SharedMemory], bool]
+        ] = OrderedDict()
+        self._n_bytes = 0
+        self._versions: dict[Hashable, str] = {}
+        self._counters: dict[Hashable, int] = {}
+        self.n_hits = 0
+        self.n_misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: CacheKey) -> Optional[ShortestPathTree]:
+        key = _canonical_key(key)
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.n_hits += 1
+            return self._entries[key][0]
+        if self.shared:
+            try:
+                shm = _attach(_segment_name(key))
+            except FileNotFoundError:
+                pass
+            else:
+                if _is_ready(shm):
+                    tree = _tree_views(shm)
+                    self._insert(key, tree, shm, owner=False)
+                    self.n_hits += 1
+                    return tree
+                # Another process is still writing the tree
+                shm.close()
+        self.n_misses += 1
+        return None
+
+    def put(self, key: CacheKey, tree: ShortestPathTree) -> ShortestPathTree:
+        """
+        Stores a copy of the tree and returns the stored (read-only) version
+        """
+        key = _canonical_key(key)
+        if key in self._entries:
+            self._remove(key)
+        if not self.shared:
+            return self._put_local(key, tree)
+
+        n = len(tree.pred)
+        try:
+            shm = shared_memory.SharedMemory(
+                name=_segment_name(key), create=True, size=_HEADER_BYTES + 16 * max(n, 1)
+            )
+        except FileExistsError:
+            # Another process has computed the same tree in the meantime
+            shm = _attach(_segment_name(key))
+            if not _is_ready(shm):
+                # and is still writing it, so the local tree is kept instead
+                shm.close()
+                return self._put_local(key, tree)
+            owner = False
+        else:
+            _write_tree(shm, tree)
+            owner = True
+        stored = _tree_views(shm)
+        self._insert(key, stored, shm, owner)
+        return stored
+
+    def get_or_compute(
+        self,
+        version: str,
+        algorithm: str,
+        source: Any,
+        compute: Callable[[], ShortestPathTree],
+        target: Any = None,
+    ) -> ShortestPathTree:
+        key = (version, algorithm, source, target)
+        tree = self.get(key)
+        if tree is None:
+            tree = self.put(key, compute())
+        return tree
+
+    def graph_version(self, graph_id: Hashable) -> str:
+        """
+        Current version of the graph known as graph_id (the graph is not hashed)
+        """
+        if graph_id not in self._versions:
+            self._versions[graph_id] = f"{graph_id!r}#{self._counters.get(graph_id, 0)}"
+        return self._versions[graph_id]
+
+    def bump_version(self, graph_id: Hashable) -> str:
+        """
+        Must be called after each modification of the graph known as graph_id.
+        Evicts the entries of its previous version and returns the new one
+        """
+        self._counters[graph_id] = self._counters.get(graph_id, 0) + 1
+        self._set_version(graph_id, f"{graph_id!r}#{self._counters[graph_id]}")
+        return self._versions[graph_id]
+
+    def update_graph(self, graph_id: Hashable, G: AnyNxGraph, weight: Optional[str] = "weight") -> str:
+        """
+        Uses the fingerprint of the graph as the version of the graph known
+        as graph_id, evicting the entries of its previous version. Takes O(m),
+        so it is meant to be called on request rather than for every query
+        """
+        self._set_version(graph_id, graph_fingerprint(G, weight=weight))
+        return self._versions[graph_id]
+
+    def invalidate(self, version: str) -> None:
+        for key in [key for key in self._entries if key[0] == version]:
+            self._remove(key)
+
+    def close(self) -> None:
+        for key in list(self._entries):
+            self._remove(key)
+
+    def _set_version(self, graph_id: Hashable, version: str) -> None:
+        old_version = self._versions.get(graph_id)
+        if old_version is not None and old_version != version:
+            self.invalidate(old_version)
+        self._versions[graph_id] = version
+
+    def _put_local(self, key: CacheKey, tree: ShortestPathTree) -> ShortestPathTree:
+        tree = ShortestPathTree(
+            pred=np.array(tree.pred, dtype=np.int64), dist=np.array(tree.dist, dtype=np.float64)
+        )
+        tree.pred.flags.writeable = False
+        tree.dist.flags.writeable = False
+        self._insert(key, tree, None, owner=False)
+        return tree
+
+    def _insert(
+        self,
+        key: CacheKey,
+        tree: ShortestPathTree,
+        shm: Optional[shared_memory.SharedMemory],
+        owner: bool,
+    ) -> None:
+        self._entries[key] = (tree, shm, owner)
+        self._n_bytes += tree.pred.nbytes + tree.dist.nbytes
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_entries or self._n_bytes > self.max_bytes
+        ):
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: CacheKey) -> None:
+        tree, shm, owner = self._entries.pop(key)
+        self._n_bytes -= tree.pred.nbytes + tree.dist.nbytes
+        if shm is not None:
+            del tree
+            try:
+                shm.close()
+            except BufferError:
+                # The tree is still used outside of the cache, the mapping
+                # is released once its arrays are garbage collected
+                pass
+            if owner:
+                # A forked process shares the resource tracker with its parent
+                # and could have unregistered the segment when attaching to it
+                _set_tracked(shm, tracked=True)
+                shm.unlink()